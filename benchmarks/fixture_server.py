@@ -0,0 +1,116 @@
+import functools
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+recorded_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recorded")
+
+page_route = re.compile(r"^/(table|page|slow)/(\d+)/(\d+)\.html$")
+
+
+@functools.lru_cache(maxsize=4096)
+def table_page(rows: int, index: int, pages: int | None = None) -> bytes:
+    """
+    Synthetic page shaped like a financial quote page: a key-info definition list, a large data table
+    and a link to the next page
+    """
+    rnd = random.Random(index)
+    info = "".join(f"<div><dt>Key {i}</dt><dd>{rnd.uniform(0, 10000):,.2f}</dd></div>" for i in range(20))
+    table = "".join(
+        f"<tr><td class='date'>2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}</td>"
+        f"<td class='price'>{rnd.uniform(0, 5000):,.2f}</td><td class='volume'>{rnd.randint(0, 10 ** 7):,}</td>"
+        f"<td class='change'>{rnd.uniform(-5, 5):.2f}%</td><td><a href='/detail/{index}/{i}'>Row {i}</a></td></tr>"
+        for i in range(rows))
+    next_link = f"<a class='next' href='{index + 1}.html'>Next</a>" if pages is None or index + 1 < pages else ""
+    return (f"<html><head><title>Page {index}</title></head><body>"
+            f"<h1>Instrument {index}</h1><div data-test='key-info'><dl>{info}</dl></div>"
+            f"<table id='data'><thead><tr><th>Date</th><th>Price</th><th>Volume</th><th>Change</th><th></th></tr>"
+            f"</thead><tbody>{table}</tbody></table>{next_link}</body></html>").encode()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    /table/<rows>/<n>.html   large table pages
+    /page/<pages>/<n>.html   pagination chain of <pages> pages with 50 rows each
+    /slow/<ms>/<n>.html      50 rows answered after <ms> milliseconds
+    /recorded/<name>         files saved under benchmarks/recorded, the query string is ignored
+    """
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, without TCP_NODELAY every keep-alive response waits for a delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        match = page_route.match(self.path)
+        if match is not None:
+            kind, arg, index = match.group(1), int(match.group(2)), int(match.group(3))
+            if kind == "table":
+                body = table_page(arg, index)
+            elif kind == "page":
+                body = table_page(50, index, arg)
+            else:
+                time.sleep(arg / 1000)
+                body = table_page(50, index)
+            return self.__send__(200, body)
+
+        if self.path.startswith("/recorded/"):
+            path = os.path.join(recorded_dir, os.path.basename(urlsplit(self.path).path))
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    return self.__send__(200, f.read())
+        self.__send__(404, b"not found")
+
+    def __send__(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def __serve__(host: str, port: int, ready: multiprocessing.Queue):
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FixtureServer(object):
+    """
+    Fixture server running in its own process so page generation does not compete with the benchmark for the GIL
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host: str = host
+        self.port: int = port
+        self.process: multiprocessing.Process | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self) -> 'FixtureServer':
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=__serve__, args=(self.host, self.port, ready), daemon=True)
+        self.process.start()
+        self.port = ready.get(timeout=10)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.process.terminate()
+        self.process.join()
+
+
+if __name__ == "__main__":
+    print("serving fixtures on http://127.0.0.1:8700, ctrl+c to stop")
+    try:
+        __serve__("127.0.0.1", 8700, multiprocessing.Queue())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,321 @@
+"""
+Offline benchmarks: pages/sec and peak RSS of XCloudScraper under xmerge_list / xmerge_fixed on synthetic and
+recorded pages, xpath extraction, value conversion throughput and import time of the entry points.
+Everything runs against the local fixture server, each benchmark in a fresh interpreter.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --quick --import-budget-ms 150
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable
+from urllib.parse import urljoin
+
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, src_dir)
+
+from lxml import html
+
+from fixture_server import FixtureServer, table_page, recorded_dir
+from fluent_scrape import XCloudScraper, XValueConverter, XSessionPool, xmerge_list, \
+    xmerge_fixed, xmulti, xsingle, xtext, xattr, xverbose
+
+recorded_pages = sorted(name for name in os.listdir(recorded_dir) if name.endswith(".html"))
+
+# metrics where a lower value is better, every other metric is a throughput
+lower_is_better = {"peak_rss_mb", "seconds", "import_ms"}
+
+# modules an http only worker must never import
+browser_stack = ("selenium", "seleniumwire")
+
+# optional dependencies imported on first use, no entry point may load them
+optional_stack = ("numpy", "redis")
+
+import_probe = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000, *[m for m in {stack!r} if m in sys.modules])
+"""
+
+
+def __rss_mb__() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler(object):
+    """
+    Peak resident memory while the block runs, sampled every interval seconds
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval: float = interval
+        self.peak: float = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.__sample__, daemon=True)
+
+    def __sample__(self):
+        while not self.stop.is_set():
+            self.peak = max(self.peak, __rss_mb__())
+            self.stop.wait(self.interval)
+
+    def __enter__(self) -> 'RssSampler':
+        self.peak = __rss_mb__()
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, __rss_mb__())
+
+
+def quote_page(g):
+    rows = []
+    for row in xmulti(g.owner, "//table[@id='data']/tbody/tr"):
+        rows.append({
+            "date": xsingle(row, "./td[@class='date']").get_text_as("datetime", "%Y-%m-%d"),
+            "price": xtext(xsingle(row, "./td[@class='price']"), "float"),
+            "volume": xtext(xsingle(row, "./td[@class='volume']"), "int"),
+            "link": xattr(xsingle(row, "./td/a"), "href")
+        })
+    return {"rows": rows}
+
+
+def key_info(g):
+    """
+    The extraction of src/example-investing.py
+    """
+    infos = []
+    for el in xmulti(g.owner.get_element("//div[@data-test='key-info']"), "./dl/div"):
+        infos.append({"name": xtext(xsingle(el, "./dt")), "value": xtext(xsingle(el, "./dd"))})
+    if not infos:
+        return None
+    return {"rows": [{"url": g.current_url, "infos": infos}]}
+
+
+def __timed_pages__(run: Callable[[], dict[str, Any]], pages: int) -> dict[str, float]:
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - start
+    if len(result.get("rows", [])) == 0:
+        raise Exception("benchmark scraped no rows")
+    return {"pages_per_sec": pages / seconds, "seconds": seconds, "peak_rss_mb": rss.peak}
+
+
+def bench_xmerge_list(base_url: str, workers: int, pages: int, kind: str = "table/200") -> dict[str, float]:
+    urls = [f"{base_url}/{kind}/{i}.html" for i in range(pages)]
+    pool = XSessionPool(max_connections_per_host=workers)
+    scrapers = [XCloudScraper(pool).from_website("quotes", urls[w::workers]).scrape(quote_page).then()
+                for w in range(workers)]
+    return __timed_pages__(lambda: xmerge_list(*scrapers), pages)
+
+
+def bench_recorded(base_url: str, name: str, workers: int, pages: int) -> dict[str, float]:
+    """
+    The example's key-info extraction over a page saved under benchmarks/recorded, every url serves the same page
+    """
+    urls = [f"{base_url}/recorded/{name}?{i}" for i in range(pages)]
+    pool = XSessionPool(max_connections_per_host=workers)
+    scrapers = [XCloudScraper(pool).from_website("companies", urls[w::workers]).scrape(key_info).then()
+                for w in range(workers)]
+    return __timed_pages__(lambda: xmerge_list(*scrapers), pages)
+
+
+def bench_xmerge_fixed(base_url: str, workers: int, pages: int) -> dict[str, float]:
+    """
+    Deep pagination: one chain of pages per worker, scrapers take the next page from a shared queue
+    fed by the next links
+    """
+    per_chain = pages // workers
+    start_urls: queue.Queue = queue.Queue()
+    for chain in range(workers):
+        start_urls.put(f"{base_url}/page/{(chain + 1) * per_chain}/{chain * per_chain}.html")
+    lock = threading.Lock()
+
+    def paginated(g):
+        for next_link in xmulti(g.owner, "//a[@class='next']"):
+            start_urls.put(urljoin(g.owner.response.url, next_link.get_attribute("href")))
+        return quote_page(g)
+
+    def next_url() -> str | None:
+        with lock:
+            try:
+                return start_urls.get_nowait()
+            except queue.Empty:
+                return None
+
+    pool = XSessionPool(max_connections_per_host=workers)
+    maker = lambda: XCloudScraper(pool).from_website("quotes", next_url).scrape(paginated).then()
+    return __timed_pages__(lambda: xmerge_fixed(maker, workers), per_chain * workers)
+
+
+def bench_extraction(rows: int, repeat: int) -> dict[str, float]:
+    """
+    XPath heavy extraction through XCloudScraperElement on an already parsed page
+    """
+    scraper = XCloudScraper()
+    scraper.tree = html.fromstring(table_page(rows, 0))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in xmulti(scraper, "//table[@id='data']/tbody/tr"):
+            for xpath in ("./td[@class='date']", "./td[@class='price']", "./td[@class='volume']", "./td/a"):
+                xsingle(row, xpath).get_text()
+    seconds = time.perf_counter() - start
+    return {"queries_per_sec": repeat * rows * 4 / seconds, "rows_per_sec": repeat * rows / seconds}
+
+
+def bench_converter(values: int) -> dict[str, float]:
+    floats = [f"{i * 1.37:,.2f}" for i in range(values)]
+    ints = [f"{i * 7:,}" for i in range(values)]
+    dates = [f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}" for i in range(values)]
+    results = {}
+    for name, column, type_name, args in (("float", floats, "float", ()), ("int", ints, "int", ()),
+                                          ("datetime", dates, "datetime", ("%Y-%m-%d",))):
+        start = time.perf_counter()
+        for value in column:
+            XValueConverter.convert(value, type_name, *args)
+        results[f"{name}_convert_per_sec"] = values / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        XValueConverter.convert_many(column, type_name, *args)
+        results[f"{name}_convert_many_per_sec"] = values / (time.perf_counter() - start)
+    return results
+
+
+def __isolated__(bench_fn: Callable[..., dict[str, float]], *args: Any) -> dict[str, float]:
+    """
+    Run bench_fn in a fresh interpreter, so its peak RSS does not include memory left by earlier benchmarks
+    """
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--isolated",
+                             json.dumps([bench_fn.__name__, *args])],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def bench_import(module: str, repeat: int) -> dict[str, float]:
+    """
+    Median time to import module in a fresh interpreter, fails when an entry point loads an optional dependency
+    or fluent_scrape.http loads the browser stack
+    """
+    stack = optional_stack + (browser_stack if module == "fluent_scrape.http" else ())
+    timings = []
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([src_dir, os.environ.get("PYTHONPATH", "")])}
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", import_probe.format(module=module, stack=stack)],
+                                env=env, check=True, capture_output=True, text=True).stdout.split()
+        if len(output) > 1:
+            raise Exception(f"{module} imported {', '.join(output[1:])}")
+        timings.append(float(output[0]))
+    return {"import_ms": statistics.median(timings)}
+
+
+def run(quick: bool) -> dict[str, Any]:
+    pages = 40 if quick else 200
+    worker_counts = (1, 4) if quick else (1, 2, 4, 8, 16)
+    benchmarks: dict[str, dict[str, float]] = {}
+    with FixtureServer() as fixture:
+        base_url = fixture.base_url
+        for workers in worker_counts:
+            benchmarks[f"xmerge_list.table.w{workers}"] = __isolated__(bench_xmerge_list, base_url, workers, pages)
+            benchmarks[f"xmerge_list.slow.w{workers}"] = __isolated__(bench_xmerge_list, base_url, workers,
+                                                                       pages // 4, "slow/50")
+            benchmarks[f"xmerge_fixed.pagination.w{workers}"] = __isolated__(bench_xmerge_fixed, base_url, workers,
+                                                                             pages)
+            for name in recorded_pages:
+                benchmarks[f"xmerge_list.recorded.{name[:-5]}.w{workers}"] = __isolated__(bench_recorded, base_url,
+                                                                                          name, workers, pages)
+    benchmarks["extraction.element"] = __isolated__(bench_extraction, 500, 5 if quick else 20)
+    benchmarks["converter"] = __isolated__(bench_converter, 20000 if quick else 200000)
+    for module in ("fluent_scrape", "fluent_scrape.http", "fluent_scrape.browser"):
+        benchmarks[f"import.{module}"] = bench_import(module, 3 if quick else 10)
+    return {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "quick": quick},
+        "benchmarks": benchmarks
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Metrics worse than the baseline by more than tolerance (relative)
+    """
+    regressions = []
+    for name, metrics in results["benchmarks"].items():
+        for metric, value in metrics.items():
+            base = baseline["benchmarks"].get(name, {}).get(metric)
+            if not base:
+                continue
+            change = (value - base) / base
+            worse = change > tolerance if metric in lower_is_better else change < -tolerance
+            print(f"{name:36} {metric:30} {base:14.2f} -> {value:14.2f} {change:+8.1%}{'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fluent-scrape offline benchmarks")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--quick", action="store_true", help="fewer pages and iterations")
+    parser.add_argument("--import-budget-ms", type=float,
+                        help="exit 1 when importing fluent_scrape.http takes longer than this")
+    parser.add_argument("--isolated", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    xverbose(False)
+    if args.isolated:
+        # child of __isolated__: run one benchmark and print its metrics
+        name, *bench_args = json.loads(args.isolated)
+        print(json.dumps(globals()[name](*bench_args)))
+        return
+
+    results = run(args.quick)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("regressions: " + ", ".join(regressions))
+            failed = True
+
+    if args.import_budget_ms is not None:
+        import_ms = results["benchmarks"]["import.fluent_scrape.http"]["import_ms"]
+        print(f"import fluent_scrape.http: {import_ms:.1f} ms, budget {args.import_budget_ms:.1f} ms")
+        if import_ms > args.import_budget_ms:
+            print("import budget exceeded")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import asyncio
+import collections
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+from lxml import html
+
+from . import XScraperGroup, XCloudScraper, XResultAccumulator, XCrawlState, xinfo
+
+
+class XAsyncLimiter(object):
+    """
+    Bounds the number of in-flight requests, globally and per host
+    """
+
+    def __init__(self, max_concurrency: int = 100, max_per_host: int = 8):
+        self.max_concurrency: int = max_concurrency
+        self.max_per_host: int = max_per_host
+        self.global_semaphore = asyncio.Semaphore(max_concurrency)
+        self.host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def acquire(self, url: str):
+        host = urlsplit(url).netloc
+        host_semaphore = self.host_semaphores.get(host)
+        if host_semaphore is None:
+            host_semaphore = self.host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+
+        async with host_semaphore:
+            async with self.global_semaphore:
+                yield
+
+
+class XAsyncScraper(XCloudScraper):
+    """
+    Asyncio scraper, every group is fetched concurrently on a single event loop.
+    The urls of a string, list or tuple are requested max(prefetch_depth, max_per_host) pages ahead, a url
+    callable and other iterables prefetch_depth pages ahead. Pages are parsed and scraped in order on the loop,
+    so scrape functions never interleave.
+    """
+
+    def __init__(self, max_concurrency: int = 100, max_per_host: int = 8, limiter: XAsyncLimiter | None = None):
+        self.session: aiohttp.ClientSession | None = None
+        self.limiter: XAsyncLimiter | None = limiter
+        self.max_concurrency: int = max_concurrency
+        self.max_per_host: int = max_per_host
+        super().__init__()
+
+    # prefetch_depth is honored on the event loop by __compute_group_async__, not by the threads of XScraperGroup
+    prefetchable = False
+
+    def __initialize_impl__(self):
+        # the aiohttp session must be created inside the running event loop
+        pass
+
+    def __prepare_document__(self, url: str, x_group: XScraperGroup = None) -> 'XAsyncScraper':
+        raise Exception("XAsyncScraper can only be used through get_results_async or xmerge_async")
+
+    def get_results(self):
+        return asyncio.run(self.get_results_async())
+
+    def resumable(self, state: XCrawlState) -> 'XAsyncScraper':
+        raise Exception("XAsyncScraper does not support crawl states, use XCloudScraper for resumable crawls")
+
+    async def __fetch_async__(self, url: str, x_group: XScraperGroup) -> bytes:
+        merged_headers = {**self.headers, **x_group.headers}
+        async with self.limiter.acquire(url):
+            start = time.perf_counter()
+            async with self.session.get(url, headers=merged_headers) as r:
+                content = await r.read()
+            if self.metrics is not None:
+                self.metrics.record_fetch(x_group.id_group, url, time.perf_counter() - start, len(content))
+            return content
+
+    def __refill_async__(self, x_group: XScraperGroup, in_flight: collections.deque, depth: int):
+        while len(in_flight) < depth:
+            next_url = x_group.__next_url__()
+            if next_url is None:
+                return
+            in_flight.append((next_url, asyncio.ensure_future(self.__fetch_async__(next_url, x_group))))
+
+    async def __compute_group_async__(self, x_group: XScraperGroup):
+        x_group.seed_urls = x_group.__iter_seed_urls__()
+        in_flight: collections.deque[tuple[str, asyncio.Future]] = collections.deque()
+        # urls known ahead keep as many fetches in flight as the limiter lets through for a host, pages are
+        # processed in order so the window also bounds the number of bodies held in memory
+        depth = x_group.prefetch_depth
+        if isinstance(x_group.url, str | list | tuple):
+            depth = max(depth, self.limiter.max_per_host)
+
+        try:
+            while True:
+                self.__refill_async__(x_group, in_flight, max(1, depth))
+                if not in_flight:
+                    return
+                next_url, future = in_flight.popleft()
+                self.__refill_async__(x_group, in_flight, depth)
+                content = await future
+                start = time.perf_counter()
+                self.tree = html.fromstring(content)
+                if self.metrics is not None:
+                    self.metrics.record_parse(x_group.id_group, next_url, time.perf_counter() - start)
+                x_group.current_url = next_url
+                xinfo("[INFO] Extracting data from url: " + next_url + " | thread_id: " + str(threading.get_ident()))
+                x_group.__compute_blocks__()
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+            x_group.seed_urls = None
+
+    async def get_results_async(self) -> dict[str, Any]:
+        """
+        Get the result, fetching every group concurrently
+        """
+        if self.limiter is None:
+            self.limiter = XAsyncLimiter(self.max_concurrency, self.max_per_host)
+
+        owns_session = self.session is None
+        if owns_session:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+        try:
+            await asyncio.gather(*[self.__compute_group_async__(group) for group in self.groups])
+        finally:
+            if owns_session:
+                await self.session.close()
+                self.session = None
+        return self.result
+
+
+async def xmerge_async(*x_scraper: XAsyncScraper, max_concurrency: int = 100,
+                       max_per_host: int = 8) -> dict[str, Any]:
+    """
+    Run every scraper on the current event loop sharing one session and one concurrency limit
+    """
+    limiter = XAsyncLimiter(max_concurrency, max_per_host)
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    for s in x_scraper:
+        s.limiter = limiter
+        s.session = session
+
+    accumulator = XResultAccumulator()
+    start = time.perf_counter()
+    try:
+        scraper_results = await asyncio.gather(*[s.get_results_async() for s in x_scraper])
+    finally:
+        await session.close()
+        for s in x_scraper:
+            s.session = None
+
+    merge_start = time.perf_counter()
+    for curr_res in scraper_results:
+        accumulator.merge(curr_res)
+    end = time.perf_counter()
+    metrics = next((s.metrics for s in x_scraper if s.metrics is not None), None)
+    if metrics is not None:
+        metrics.record_merge(end - merge_start)
+    xinfo(f"scrapers execution and merge took {end - start:0.4f} seconds")
+    return accumulator.result
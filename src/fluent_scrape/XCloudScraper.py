@@ -1,10 +1,14 @@
+import time
 from typing import Any
 
 import cloudscraper
-from lxml import html
+import requests
+from lxml import etree, html
 from lxml.html import HtmlElement
+from requests.cookies import get_cookie_header
 
-from . import XScraper, XScraperElement, XScraperGroup
+from . import XScraper, XScraperElement, XScraperGroup, XSessionPool, XResponseCache, XExtractionPlan, \
+    XHostController, xpath_cache, xinfo
 
 
 class XCloudScraperElement(XScraperElement['XCloudScraper', HtmlElement]):
@@ -21,38 +25,138 @@ class XCloudScraperElement(XScraperElement['XCloudScraper', HtmlElement]):
     def get_html(self) -> str:
         return html.tostring(self.native_element).strip()
 
-    def get_multiple_by_xpath(self, xpath: str, timeout: float = 0):
-        return [XCloudScraperElement(self.__scraper__, e) for e in self.native_element.xpath(xpath)]
+    def get_multiple_by_xpath(self, xpath: str, timeout: float = 0, **variables):
+        self.__scraper__.xpath_queries += 1
+        return [XCloudScraperElement(self.__scraper__, e)
+                for e in xpath_cache.evaluate(self.native_element, xpath, **variables)]
 
-    def get_single_by_xpath(self, xpath: str, timeout: float = 0):
-        res = self.native_element.xpath(xpath)
+    def get_single_by_xpath(self, xpath: str, timeout: float = 0, **variables):
+        self.__scraper__.xpath_queries += 1
+        res = xpath_cache.evaluate(self.native_element, xpath, **variables)
         return None if len(res) == 0 else XCloudScraperElement(self.__scraper__, res[0])
 
 
 class XCloudScraper(XScraper[XCloudScraperElement]):
 
-    def __init__(self):
+    def __init__(self, session_pool: XSessionPool | None = None, cache: XResponseCache | None = None,
+                 host_controller: XHostController | None = None):
         self.scraper: cloudscraper.CloudScraper | None = None
+        self.session_pool: XSessionPool | None = session_pool
+        self.cache: XResponseCache | None = cache
+        self.host_controller: XHostController | None = host_controller
+        self.response: Any = None
         self.tree: Any = None
         super().__init__()
 
     def __initialize_impl__(self):
-        self.scraper = cloudscraper.create_scraper()
-
-    def __prepare_document__(self, url: str, x_group: XScraperGroup = None) -> 'XCloudScraper':
+        if self.session_pool is not None:
+            self.scraper = self.session_pool.create_session()
+        else:
+            self.scraper = cloudscraper.create_scraper()
+
+    def __fetch_response__(self, url: str, x_group: XScraperGroup = None) -> Any:
+        if self.metrics is None:
+            return self.__request__(url, x_group)
+
+        start = time.perf_counter()
+        response = self.__request__(url, x_group)
+        self.metrics.record_fetch(x_group.id_group if x_group is not None else None, url,
+                                  time.perf_counter() - start, len(response.content))
+        return response
+
+    def __request__(self, url: str, x_group: XScraperGroup = None) -> Any:
+        merged_headers = {**self.headers, **x_group.headers} if x_group is not None else self.headers
+        if self.cache is None:
+            return self.__send__(url, merged_headers)
+
+        # the headers the session adds, with the cookies of the jar, are matched against Vary
+        session_headers = dict(self.scraper.headers)
+        cookie = get_cookie_header(self.scraper.cookies, requests.Request("GET", url))
+        if cookie:
+            session_headers["Cookie"] = cookie
+        return self.cache.fetch(url, merged_headers, self.__send__, session_headers)
+
+    def __send__(self, url: str, headers: dict[str, str], **kwargs) -> Any:
+        if self.host_controller is None:
+            return self.scraper.get(url, headers=headers, **kwargs)
+
+        return self.host_controller.fetch(
+            url, lambda: self.scraper.get(url, headers=headers, timeout=self.host_controller.timeout, **kwargs))
+
+    prefetchable = True
+
+    def __fetch_raw__(self, url: str, x_group: XScraperGroup = None) -> tuple[Any, bytes]:
+        response = self.__fetch_response__(url, x_group)
+        return response, response.content
+
+    def __parse_raw__(self, url: str, raw: Any, x_group: XScraperGroup = None) -> tuple[Any, Any]:
+        if self.metrics is None:
+            return raw, html.fromstring(raw.content)
+
+        start = time.perf_counter()
+        tree = html.fromstring(raw.content)
+        self.metrics.record_parse(x_group.id_group if x_group is not None else None, url,
+                                  time.perf_counter() - start)
+        return raw, tree
+
+    def __stream_document__(self, url: str, x_group: XScraperGroup) -> tuple[Any, Any]:
+        """
+        Feed the body to a pull parser chunk by chunk and stop once every stream xpath matched an element
+        the parser is already past. The response body is consumed, response.content is not available
+        """
         merged_headers = {**self.headers, **x_group.headers}
-        r = self.scraper.get(url, headers=merged_headers)
-        self.tree = html.fromstring(r.content)
+        start = time.perf_counter()
+        response = self.__send__(url, merged_headers, stream=True)
+        # a single event for the root element, every other event would create a python proxy
+        parser = etree.HTMLPullParser(events=("start",), tag="html")
+        parser.set_element_class_lookup(html.HtmlElementClassLookup())
+        root = None
+        size = 0
+        try:
+            for chunk in response.iter_content(x_group.stream_chunk_size):
+                size += len(chunk)
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    root = element
+                if root is not None and x_group.stream_xpaths and all(
+                        any(xpath_cache.evaluate(e, "boolean(following::node())")
+                            for e in xpath_cache.evaluate(root, xpath))
+                        for xpath in x_group.stream_xpaths):
+                    break
+        finally:
+            response.close()
+
+        tree = parser.close()
+        if self.metrics is not None:
+            self.metrics.record_fetch(x_group.id_group, url, time.perf_counter() - start, size)
+        return response, tree
+
+    def __fetch_document__(self, url: str, x_group: XScraperGroup = None) -> tuple[Any, Any]:
+        if x_group is not None and x_group.stream_xpaths is not None and self.cache is None:
+            return self.__stream_document__(url, x_group)
+        return self.__parse_raw__(url, self.__fetch_response__(url, x_group), x_group)
+
+    def __load_document__(self, document: tuple[Any, Any]) -> 'XCloudScraper':
+        self.response, self.tree = document
         return self
 
-    def get_elements(self, xpath: str, timeout: float = 0) -> list[XCloudScraperElement]:
-        elements: list[HtmlElement] = self.tree.xpath(xpath)
+    def __prepare_document__(self, url: str, x_group: XScraperGroup = None) -> 'XCloudScraper':
+        return self.__load_document__(self.__fetch_document__(url, x_group))
+
+    def extract(self, plan: XExtractionPlan) -> list[dict[str, Any]] | dict[str, Any]:
+        self.xpath_queries += 1
+        return plan.run_tree(self.tree, self.__failure_hook__())
+
+    def get_elements(self, xpath: str, timeout: float = 0, **variables) -> list[XCloudScraperElement]:
+        self.xpath_queries += 1
+        elements: list[HtmlElement] = xpath_cache.evaluate(self.tree, xpath, **variables)
         return [XCloudScraperElement(self, e) for e in elements]
 
-    def get_element(self, xpath: str, timeout: float = 0) -> XCloudScraperElement:
-        elements: list[HtmlElement] = self.tree.xpath(xpath)
+    def get_element(self, xpath: str, timeout: float = 0, **variables) -> XCloudScraperElement:
+        self.xpath_queries += 1
+        elements: list[HtmlElement] = xpath_cache.evaluate(self.tree, xpath, **variables)
         if len(elements) == 0 or not elements:
-            print(f"Could not find element with xpath: {xpath}")
+            xinfo(f"Could not find element with xpath: {xpath}")
             return XCloudScraperElement(self, None)
 
         return XCloudScraperElement(self, elements[0])
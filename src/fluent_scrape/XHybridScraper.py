@@ -0,0 +1,188 @@
+import time
+from typing import Any, Callable
+
+from lxml import etree, html
+
+from . import XScraper, XScraperElement, XScraperGroup, XCloudScraper, XSessionPool, XResponseCache, \
+    XBrowserOptions, XSeleniumScraper, XBrowserPool, XMetrics, xpath_cache, xinfo
+
+detector_type = Callable[[XCloudScraper], bool]
+
+challenge_markers: list[str] = [
+    "cf-browser-verification", "challenge-platform", "cf_chl_opt", "<title>Just a moment...</title>",
+    "Attention Required! | Cloudflare", "enable JavaScript and cookies to continue"
+]
+
+
+def xblocked_status(*status_codes: int) -> detector_type:
+    """
+    Blocked when the response status is one of status_codes
+    """
+    codes = set(status_codes) if status_codes else {403, 429, 503}
+    return lambda s: s.response is None or s.response.status_code in codes
+
+
+def xblocked_markers(*markers: str) -> detector_type:
+    """
+    Blocked when the body contains any of the markers
+    """
+    encoded = [m.encode() for m in (markers if markers else challenge_markers)]
+    return lambda s: s.response is None or any(m in s.response.content for m in encoded)
+
+
+def xmissing_anchors(*xpaths: str) -> detector_type:
+    """
+    Blocked when none of the xpaths matches, the page probably needs JavaScript to render
+    """
+    return lambda s: s.tree is None or not any(len(xpath_cache.evaluate(s.tree, xpath)) > 0 for xpath in xpaths)
+
+
+class XHybridScraper(XScraper[XScraperElement]):
+    """
+    Fetches through XCloudScraper and falls back to a browser only when a detector reports the page as blocked.
+    Cookies and user agent obtained by the browser are handed back to the http session, so following
+    requests stay on the fast path.
+    """
+
+    def __init__(self, browser_options: XBrowserOptions, browser_pool: XBrowserPool | None = None,
+                 detectors: list[detector_type] | None = None, session_pool: XSessionPool | None = None,
+                 cache: XResponseCache | None = None, snapshot: bool = True):
+        self.browser_options: XBrowserOptions = browser_options
+        self.browser_pool: XBrowserPool | None = browser_pool
+        self.detectors: list[detector_type] = detectors if detectors is not None \
+            else [xblocked_status(), xblocked_markers()]
+        self.session_pool: XSessionPool | None = session_pool
+        self.cache: XResponseCache | None = cache
+        self.snapshot: bool = snapshot
+        self.http: XCloudScraper | None = None
+        self.browser: XSeleniumScraper | None = None
+        self.active: XScraper | None = None
+        self.user_agent: str | None = None
+        self.http_pages: int = 0
+        self.browser_pages: int = 0
+        super().__init__()
+
+    def __initialize_impl__(self):
+        self.http = XCloudScraper(self.session_pool, self.cache)
+        self.active = self.http
+        if self.metrics is not None:
+            self.http.instrument(self.metrics)
+
+    @property
+    def xpath_queries(self) -> int:
+        """
+        Lookups made on the inner scrapers, their elements count on the scraper that created them
+        """
+        return (self.http.xpath_queries if self.http is not None else 0) + \
+            (self.browser.xpath_queries if self.browser is not None else 0)
+
+    @xpath_queries.setter
+    def xpath_queries(self, value: int):
+        # only set by XScraper.__init__, before the inner scrapers exist
+        pass
+
+    @property
+    def current_group(self) -> XScraperGroup | None:
+        return self.http.current_group if self.http is not None else None
+
+    @current_group.setter
+    def current_group(self, x_group: XScraperGroup | None):
+        # converter failures are recorded by the inner scraper extracting the page
+        if self.http is not None:
+            self.http.current_group = x_group
+        if self.browser is not None:
+            self.browser.current_group = x_group
+
+    def instrument(self, metrics: XMetrics) -> 'XHybridScraper':
+        super().instrument(metrics)
+        self.http.instrument(metrics)
+        if self.browser is not None:
+            self.browser.instrument(metrics)
+        return self
+
+    def __browser__(self) -> XSeleniumScraper:
+        if self.browser is None:
+            self.browser = XSeleniumScraper(self.browser_options, snapshot=self.snapshot, pool=self.browser_pool)
+            self.browser.current_group = self.http.current_group
+            if self.metrics is not None:
+                self.browser.instrument(self.metrics)
+        if self.browser.driver is None:
+            if self.browser_pool is not None:
+                self.browser.__lease__()
+            else:
+                # closed, start a new browser
+                self.browser.__initialize_impl__()
+        return self.browser
+
+    def __is_blocked__(self) -> bool:
+        return any(detector(self.http) for detector in self.detectors)
+
+    def __prepare_document__(self, url: str, x_group: XScraperGroup = None) -> 'XHybridScraper':
+        self.http.headers = {**self.headers, "User-Agent": self.user_agent} if self.user_agent else self.headers
+        self.http.response = self.http.__fetch_response__(url, x_group)
+        start = time.perf_counter()
+        try:
+            self.http.tree = html.fromstring(self.http.response.content)
+        except (etree.ParserError, ValueError):
+            self.http.tree = None
+        if self.metrics is not None:
+            self.metrics.record_parse(x_group.id_group if x_group is not None else None, url,
+                                      time.perf_counter() - start)
+
+        if not self.__is_blocked__():
+            self.active = self.http
+            self.http_pages += 1
+            return self
+
+        xinfo("[INFO] Falling back to browser for url: " + url)
+        self.__browser__().__prepare_document__(url, x_group)
+        self.active = self.browser
+        self.browser_pages += 1
+        self.__handoff__()
+        return self
+
+    def __fetch_raw__(self, url: str, x_group: XScraperGroup = None) -> tuple[Any, bytes]:
+        self.__prepare_document__(url, x_group)
+        if self.active is self.http:
+            return None, self.http.response.content
+        return None, self.browser.driver.page_source.encode()
+
+    def __parse_raw__(self, url: str, raw: Any, x_group: XScraperGroup = None) -> Any:
+        return raw
+
+    def __load_document__(self, document: Any) -> 'XHybridScraper':
+        # the page is already loaded by __fetch_raw__
+        return self
+
+    def __handoff__(self):
+        """
+        Copy browser cookies and user agent into the http session
+        """
+        driver = self.browser.driver
+        for cookie in driver.get_cookies():
+            self.http.scraper.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                                          path=cookie.get('path', '/'))
+        self.user_agent = driver.execute_script("return navigator.userAgent;")
+
+    def __finish__(self, error: BaseException | None = None):
+        if self.browser is not None:
+            self.browser.__finish__(error)
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+
+    def get_elements(self, xpath: str, timeout: float = 0, **variables) -> list[XScraperElement]:
+        return self.active.get_elements(xpath, timeout, **variables)
+
+    def get_element(self, xpath: str, timeout: float = 0, **variables) -> XScraperElement:
+        return self.active.get_element(xpath, timeout, **variables)
+
+    def extract(self, plan: Any) -> list[dict[str, Any]] | dict[str, Any]:
+        return self.active.extract(plan)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "http_pages": self.http_pages,
+            "browser_pages": self.browser_pages
+        }
@@ -1,57 +1,107 @@
 import abc
-from typing import Any, Callable, Tuple, Literal, TypeVar, Generic
+import collections
+from typing import Any, Callable, Iterable, Iterator, Tuple, Literal, TypeVar, Generic
+import queue
 import time
 import threading
 
-from deepmerge import always_merger
+from concurrent.futures import Future, ThreadPoolExecutor
 from multiprocessing.pool import ThreadPool
 
-from . import XValueConverter
+from . import XValueConverter, XResultAccumulator, XMetrics, XCrawlState, failure_hook_type, xinfo
 
 
-def xmerge_list(*x_scraper: 'XScraper') -> dict[str, Any]:
+def xmerge_list(*x_scraper: 'XScraper', metrics: XMetrics | None = None) -> dict[str, Any]:
+    """
+    Run every scraper on its own thread and merge their results,
+    merge time is recorded in metrics (or the metrics of the first instrumented scraper)
+    """
     pool = ThreadPool(processes=len(x_scraper))
+    if metrics is None:
+        metrics = next((s.metrics for s in x_scraper if s.metrics is not None), None)
 
-    result: dict[str, Any] = {}
+    accumulator = XResultAccumulator()
     start = time.perf_counter()
     scraper_results = pool.map(lambda s: s.get_results(), x_scraper)
+    merge_start = time.perf_counter()
     for curr_res in scraper_results:
-        result = always_merger.merge(result, curr_res)
+        accumulator.merge(curr_res)
     end = time.perf_counter()
-    print(f"scrapers execution and merge took {end - start:0.4f} seconds")
-    return result
+    if metrics is not None:
+        metrics.record_merge(end - merge_start)
+    xinfo(f"scrapers execution and merge took {end - start:0.4f} seconds")
+    return accumulator.result
 
 
-def xmerge_fixed(scraper_maker: Callable[[], 'XScraper'], scraper_number: int) -> dict[str, Any]:
-    x_scraper = [scraper_maker() for _ in range(scraper_number)]
-    pool = ThreadPool(processes=len(x_scraper))
+def xmerge_fixed(scraper_maker: Callable[[], 'XScraper'], scraper_number: int,
+                 metrics: XMetrics | None = None) -> dict[str, Any]:
+    return xmerge_list(*[scraper_maker() for _ in range(scraper_number)], metrics=metrics)
 
-    result: dict[str, Any] = {}
-    start = time.perf_counter()
-    scraper_results = pool.map(lambda s: s.get_results(), x_scraper)
-    for curr_res in scraper_results:
-        result = always_merger.merge(result, curr_res)
-    end = time.perf_counter()
-    print(f"scrapers execution and merge took {end - start:0.4f} seconds")
-    return result
 
+def xmerge_stream(*x_scraper: 'XScraper', max_pending: int = 1000) -> Iterator[dict[str, Any]]:
+    """
+    Run every scraper on its own thread and yield records as they are produced,
+    scrapers block once max_pending records are waiting to be consumed
+    """
+    records: queue.Queue = queue.Queue(maxsize=max_pending)
+    cancelled = threading.Event()
+    done = object()
+
+    def put(item: Any) -> bool:
+        while not cancelled.is_set():
+            try:
+                records.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(s: 'XScraper'):
+        try:
+            for record in s.iter_results():
+                if not put(record):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
 
-def xsingle(x_element: 'XScraper | XScraperElement | None', xpath: str, timeout: float = 0) -> 'XScraperElement | None':
+    pool = ThreadPool(processes=len(x_scraper))
+    pool.map_async(produce, x_scraper)
+    pool.close()
+
+    try:
+        remaining = len(x_scraper)
+        while remaining > 0:
+            record = records.get()
+            if record is done:
+                remaining -= 1
+            elif isinstance(record, BaseException):
+                raise record
+            else:
+                yield record
+    finally:
+        cancelled.set()
+        pool.join()
+
+
+def xsingle(x_element: 'XScraper | XScraperElement | None', xpath: str, timeout: float = 0,
+            **variables) -> 'XScraperElement | None':
     if x_element is None:
         return None
 
     if isinstance(x_element, XScraper):
-        return x_element.get_element(xpath, timeout)
-    return x_element.get_single_by_xpath(xpath, timeout)
+        return x_element.get_element(xpath, timeout, **variables)
+    return x_element.get_single_by_xpath(xpath, timeout, **variables)
 
 
-def xmulti(x_element: 'XScraper | XScraperElement | None', xpath: str, timeout: float = 0) -> 'list[XScraperElement]':
+def xmulti(x_element: 'XScraper | XScraperElement | None', xpath: str, timeout: float = 0,
+           **variables) -> 'list[XScraperElement]':
     if x_element is None:
         return []
 
     if isinstance(x_element, XScraper):
-        return x_element.get_elements(xpath, timeout)
-    return x_element.get_multiple_by_xpath(xpath, timeout)
+        return x_element.get_elements(xpath, timeout, **variables)
+    return x_element.get_multiple_by_xpath(xpath, timeout, **variables)
 
 
 def xtext(x_element: 'XScraperElement | None', type_name: str = None):
@@ -68,7 +118,7 @@ def xattr(x_element: 'XScraperElement | None', attr: str, type_name: str = None,
     return x_element.get_attribute_as(attr, type_name, *args) if type_name else x_element.get_attribute(attr)
 
 
-url_type = str | Callable[[], str | None]
+url_type = str | Iterable[str] | Callable[[], str | None] | None
 X_NATIVE_ELEMENT = TypeVar('X_NATIVE_ELEMENT')
 X_SCRAPER = TypeVar('X_SCRAPER', bound='XScraper')
 X_ELEMENT = TypeVar('X_ELEMENT', bound='XScraperElement')
@@ -81,8 +131,14 @@ class XScraper(Generic[X_ELEMENT], metaclass=abc.ABCMeta):
     """
 
     def __init__(self: X_SCRAPER):
+        self.accumulator: XResultAccumulator = XResultAccumulator()
+        self.metrics: XMetrics | None = None
+        self.state: XCrawlState | None = None
+        # xpath lookups made by scrape functions, read around each page when instrumented
+        self.xpath_queries: int = 0
+        # group whose scrape functions are running, converter failures are attributed to it when instrumented
+        self.current_group: XScraperGroup | None = None
         self.__initialize_impl__()
-        self.result: dict[str, Any] = {}
         self.headers: dict[str, str] = {}
         self.groups: list[XScraperGroup[X_SCRAPER, X_ELEMENT]] = []
         self.custom_data = {}
@@ -94,6 +150,41 @@ class XScraper(Generic[X_ELEMENT], metaclass=abc.ABCMeta):
         """
         pass
 
+    @property
+    def result(self) -> dict[str, Any]:
+        return self.accumulator.result
+
+    @result.setter
+    def result(self, value: dict[str, Any]):
+        self.accumulator.result = value
+
+    def instrument(self: X_SCRAPER, metrics: XMetrics) -> X_SCRAPER:
+        """
+        Record fetch, parse, scrape function and merge timings into metrics, and the failures of _or_none
+        conversions made through this scraper's elements and extraction plans by group and url
+        """
+        self.metrics = metrics
+        return self
+
+    def __failure_hook__(self: X_SCRAPER) -> failure_hook_type | None:
+        """
+        Converter failure hook recording into metrics for the group and url being scraped, None without metrics
+        """
+        metrics = self.metrics
+        if metrics is None:
+            return None
+        group = self.current_group
+        id_group, url = (group.id_group, group.current_url) if group is not None else (None, None)
+        return lambda type_name, value, error: metrics.record_converter_failure(type_name, value, error, id_group, url)
+
+    def resumable(self: X_SCRAPER, state: XCrawlState) -> X_SCRAPER:
+        """
+        Keep the crawl in state: an interrupted run resumes where it stopped and unchanged pages are not parsed.
+        Groups then process their urls one by one, prefetch is ignored
+        """
+        self.state = state
+        return self
+
     def global_headers(self: X_SCRAPER, headers: dict[str, str]):
         """
         Set global headers
@@ -108,19 +199,37 @@ class XScraper(Generic[X_ELEMENT], metaclass=abc.ABCMeta):
         return new_group
 
     @abc.abstractmethod
-    def get_elements(self: X_SCRAPER, xpath: str, timeout: float = 0) -> list[X_ELEMENT]:
+    def get_elements(self: X_SCRAPER, xpath: str, timeout: float = 0, **variables) -> list[X_ELEMENT]:
         """
-        Abstract method for getting elements from a page
+        Abstract method for getting elements from a page, $name references in xpath are bound to variables
         """
         return []
 
     @abc.abstractmethod
-    def get_element(self: X_SCRAPER, xpath: str, timeout: float = 0) -> X_ELEMENT:
+    def get_element(self: X_SCRAPER, xpath: str, timeout: float = 0, **variables) -> X_ELEMENT:
         """
-        Abstract method for getting an element from a page
+        Abstract method for getting an element from a page, $name references in xpath are bound to variables
         """
         return XScraperElement(self, None)
 
+    def extract(self: X_SCRAPER, plan: Any) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Run an XExtractionPlan on the current document. The default reads every field of every row through
+        the element API, scrapers override it with a single pass over their document
+        """
+        rows = self.get_elements(plan.row_xpath) if plan.row_xpath is not None else [None]
+        raw = []
+        for row in rows:
+            values = {}
+            for name, field in plan.fields.items():
+                found = row.get_multiple_by_xpath(field.xpath) if row is not None else self.get_elements(field.xpath)
+                value = None
+                if found:
+                    value = found[0].get_attribute(field.attr) if field.attr is not None else found[0].get_text()
+                values[name] = value.strip() or None if value is not None else None
+            raw.append(values)
+        return plan.run_raw(raw if plan.row_xpath is not None else raw[0], self.__failure_hook__())
+
     def __append_result__(self: X_SCRAPER, key: str, value: Any):
         """
         Append a result
@@ -150,14 +259,87 @@ class XScraper(Generic[X_ELEMENT], metaclass=abc.ABCMeta):
         """
         Get the result
         """
-        for group in self.groups:
-            group.compute_result()
+        try:
+            if self.state is None:
+                for group in self.groups:
+                    group.compute_result()
+            else:
+                for res in self.__iter_all__():
+                    self.accumulator.add(res)
+        except BaseException as e:
+            self.__finish__(e)
+            raise
+        self.__finish__()
         return self.result
 
+    def iter_results(self: X_SCRAPER):
+        """
+        Yield the output of every scrape function as soon as its page is processed, nothing is kept in result
+        """
+        try:
+            yield from self.__iter_all__()
+        except BaseException as e:
+            self.__finish__(e)
+            raise
+        self.__finish__()
+
+    def __iter_all__(self: X_SCRAPER):
+        if self.state is None:
+            for group in self.groups:
+                yield from group.iter_result()
+            return
+
+        self.state.begin()
+        completed = False
+        try:
+            for group in self.groups:
+                yield from group.iter_result()
+            completed = True
+        finally:
+            self.state.finish(completed)
+
+    def __finish__(self: X_SCRAPER, error: BaseException | None = None):
+        """
+        Called when the scraper is done processing pages, or after a page failed with error.
+        Scrapers holding leased resources return them here, __prepare_document__ acquires them again
+        """
+        pass
+
     @abc.abstractmethod
     def __prepare_document__(self: X_SCRAPER, url: str, x_group: X_GROUP = None) -> X_SCRAPER:
         return self
 
+    # scrapers able to fetch a document without replacing the current one support group prefetching
+    prefetchable: bool = False
+
+    def __fetch_document__(self: X_SCRAPER, url: str, x_group: X_GROUP = None) -> Any:
+        """
+        Fetch and parse url without touching the current document, may run on another thread.
+        With the default __fetch_raw__ the document does become the current one, such scrapers are not prefetchable
+        """
+        raw, _ = self.__fetch_raw__(url, x_group)
+        return self.__parse_raw__(url, raw, x_group)
+
+    def __load_document__(self: X_SCRAPER, document: Any) -> X_SCRAPER:
+        """
+        Make a document returned by __fetch_document__ the current one, by default it already is
+        """
+        return self
+
+    def __fetch_raw__(self: X_SCRAPER, url: str, x_group: X_GROUP = None) -> tuple[Any, bytes]:
+        """
+        Fetch without parsing, returns the raw document and the bytes hashed by a crawl state.
+        The default prepares url as the current document and hashes its html
+        """
+        self.__prepare_document__(url, x_group)
+        return None, self.get_element("/*").get_html().encode()
+
+    def __parse_raw__(self: X_SCRAPER, url: str, raw: Any, x_group: X_GROUP = None) -> Any:
+        """
+        Turn a raw document returned by __fetch_raw__ into a document for __load_document__
+        """
+        return raw
+
 
 class XScraperElement(Generic[X_SCRAPER, X_NATIVE_ELEMENT], metaclass=abc.ABCMeta):
     def __init__(self: X_ELEMENT, scraper: X_SCRAPER, native_element: X_NATIVE_ELEMENT | None):
@@ -169,25 +351,27 @@ class XScraperElement(Generic[X_SCRAPER, X_NATIVE_ELEMENT], metaclass=abc.ABCMet
         pass
 
     def get_attribute_as(self: X_ELEMENT, attribute: str, type_name: str = "str", *args) -> Any:
-        return XValueConverter.convert(self.get_attribute(attribute), type_name, *args)
+        return XValueConverter.convert(self.get_attribute(attribute), type_name, *args,
+                                       failure_hook=self.__scraper__.__failure_hook__())
 
     @abc.abstractmethod
     def get_text(self: X_ELEMENT) -> str:
         pass
 
     def get_text_as(self: X_ELEMENT, type_name: str = "str", *args) -> Any:
-        return XValueConverter.convert(self.get_text(), type_name, *args)
+        return XValueConverter.convert(self.get_text(), type_name, *args,
+                                       failure_hook=self.__scraper__.__failure_hook__())
 
     @abc.abstractmethod
     def get_html(self: X_ELEMENT) -> str:
         pass
 
     @abc.abstractmethod
-    def get_multiple_by_xpath(self: X_ELEMENT, xpath: str, timeout: float = 0) -> list[X_ELEMENT]:
+    def get_multiple_by_xpath(self: X_ELEMENT, xpath: str, timeout: float = 0, **variables) -> list[X_ELEMENT]:
         pass
 
     @abc.abstractmethod
-    def get_single_by_xpath(self: X_ELEMENT, xpath: str, timeout: float = 0) -> X_ELEMENT:
+    def get_single_by_xpath(self: X_ELEMENT, xpath: str, timeout: float = 0, **variables) -> X_ELEMENT:
         pass
 
 
@@ -201,35 +385,224 @@ class XScraperGroup(Generic[X_SCRAPER, X_ELEMENT]):
             headers = {}
         self.headers = headers
         self.scrape_fns: list[Callable[['X_GROUP'], Any | None]] = []
+        self.frontier: Any = None
+        self.pending: collections.deque[str] = collections.deque()
+        self.seen: set[str] = set()
+        self.prefetch_depth: int = 0
+        self.stream_xpaths: tuple[str, ...] | None = None
+        self.stream_chunk_size: int = 65536
+        self.in_flight: collections.deque[tuple[str, Future]] | None = None
+        self.executor: ThreadPoolExecutor | None = None
+        self.seed_urls: Iterator[str] | None = None
+        self.current_url: str | None = None
+        # urls enqueued by the scrape functions of the current page, kept by a crawl state
+        self.recording: list[tuple[str, int, str | None]] | None = None
 
     def scrape(self: X_GROUP, scrape_fn: Callable[['X_GROUP'], Any | None]):
         self.scrape_fns.append(scrape_fn)
         return self
 
-    def __compute_blocks__(self):
+    def prefetch(self: X_GROUP, depth: int) -> X_GROUP:
+        """
+        Fetch and parse up to depth next urls in the background while the current page is extracted.
+        Next urls are known ahead for strings, lists or iterables, are taken from enqueue as soon as a scrape
+        function calls it, and a url callable is called ahead of the page being processed.
+        """
+        self.prefetch_depth = depth
+        return self
+
+    def stream(self: X_GROUP, *xpaths: str, chunk_size: int = 65536) -> X_GROUP:
+        """
+        Parse pages while they download and stop reading once every xpath matched a complete element,
+        the rest of the page is then missing from the document. Without xpaths the whole body is streamed,
+        which avoids holding the raw bytes and the tree at once. Scrapers without streaming support ignore it
+        """
+        self.stream_xpaths = xpaths
+        self.stream_chunk_size = chunk_size
+        return self
+
+    def bind(self: X_GROUP, owner: X_SCRAPER, frontier: Any = None) -> X_GROUP:
+        """
+        Copy of the group running the same scrape functions on another scraper
+        """
+        group = XScraperGroup[X_SCRAPER, X_ELEMENT](owner, self.id_group, self.url, self.headers)
+        group.scrape_fns = self.scrape_fns
+        group.frontier = frontier
+        group.prefetch_depth = self.prefetch_depth
+        group.stream_xpaths = self.stream_xpaths
+        group.stream_chunk_size = self.stream_chunk_size
+        return group
+
+    def enqueue(self: X_GROUP, url: str, priority: int = 0, id_group: str | None = None) -> bool:
+        """
+        Schedule a discovered url for this group (or the group id_group), urls already seen are ignored.
+        Without a frontier the url is processed after the group's own urls, serially.
+        """
+        if self.recording is not None:
+            self.recording.append((url, priority, id_group))
+        if self.frontier is not None:
+            return self.frontier.submit(id_group if id_group is not None else self.id_group, url, priority)
+
+        target = self
+        if id_group is not None and id_group != self.id_group:
+            target = next((g for g in self.owner.groups if g.id_group == id_group), None)
+            if target is None:
+                raise Exception(f"Unknown group: {id_group}")
+
+        if url in target.seen:
+            return False
+        target.seen.add(url)
+        target.pending.append(url)
+        if target.in_flight is not None:
+            target.__refill__()
+        return True
+
+    def __iter_blocks__(self):
+        """
+        Run every scrape function on the current document, yielding each output as soon as it is ready
+        """
+        metrics = self.owner.metrics
+        if metrics is None:
+            for scrape_fn in self.scrape_fns:
+                res = scrape_fn(self)
+                if res is not None:
+                    yield res
+            return
+
+        queries = self.owner.xpath_queries
         for scrape_fn in self.scrape_fns:
+            self.owner.current_group = self
+            start = time.perf_counter()
             res = scrape_fn(self)
-            if res is None:
-                continue
+            fn_name = getattr(scrape_fn, "__name__", type(scrape_fn).__name__)
+            metrics.record_scrape(self.id_group, self.current_url, fn_name, time.perf_counter() - start)
+            if res is not None:
+                yield res
+        metrics.record_xpath_queries(self.id_group, self.current_url, self.owner.xpath_queries - queries)
 
-            self.owner.result = always_merger.merge(self.owner.result, res)
+    def __compute_blocks__(self):
+        for res in self.__iter_blocks__():
+            self.owner.accumulator.add(res)
 
-    def compute_result(self):
+    def __iter_seed_urls__(self):
+        """
+        Yield the urls the group was declared with, calling the url callable until it returns None
+        """
         if isinstance(self.url, str):
-            self.owner.__prepare_document__(self.url, self)
-            print("[INFO] Extracting data from url: " + self.url + " | thread_id: " + str(threading.get_ident()))
-            self.__compute_blocks__()
-            return None
-
-        next_url = self.url()
-        while next_url is not None:
-            self.owner.__prepare_document__(next_url, self)
-            print("[INFO] Extracting data from url: " + next_url + " | thread_id: " + str(threading.get_ident()))
-            self.__compute_blocks__()
-            prev_url = next_url
+            self.seen.add(self.url)
+            yield self.url
+        elif callable(self.url):
             next_url = self.url()
-            if next_url == prev_url:
-                print("[WARNING] Current url is the same as the next one... id: " + self.id_group + " | thread_id: " + str(threading.get_ident()))
+            while next_url is not None:
+                self.seen.add(next_url)
+                yield next_url
+                prev_url = next_url
+                next_url = self.url()
+                if next_url == prev_url:
+                    xinfo("[WARNING] Current url is the same as the next one... id: " + self.id_group +
+                          " | thread_id: " + str(threading.get_ident()))
+        elif self.url is not None:
+            for next_url in self.url:
+                self.seen.add(next_url)
+                yield next_url
+
+    def __iter_urls__(self):
+        """
+        Yield every url of the group, then the urls enqueued while processing
+        """
+        yield from self.__iter_seed_urls__()
+        while self.pending:
+            yield self.pending.popleft()
+
+    def __next_url__(self) -> str | None:
+        next_url = next(self.seed_urls, None)
+        if next_url is None and self.pending:
+            next_url = self.pending.popleft()
+        return next_url
+
+    def __refill__(self):
+        while len(self.in_flight) < self.prefetch_depth:
+            next_url = self.__next_url__()
+            if next_url is None:
+                return
+            self.in_flight.append((next_url, self.executor.submit(self.owner.__fetch_document__, next_url, self)))
+
+    def __iter_prefetched__(self):
+        """
+        Yield (url, document) while the next documents are fetched in the background
+        """
+        self.seed_urls = self.__iter_seed_urls__()
+        self.in_flight = collections.deque()
+        self.executor = ThreadPoolExecutor(max_workers=self.prefetch_depth)
+        try:
+            self.__refill__()
+            while self.in_flight:
+                next_url, future = self.in_flight.popleft()
+                self.__refill__()
+                yield next_url, future.result()
+                self.__refill__()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.in_flight = None
+            self.executor = None
+            self.seed_urls = None
+
+    def __iter_stateful__(self):
+        """
+        Like iter_result with the owner's crawl state: pages already processed by the current run and pages
+        whose content hash did not change are not parsed, their stored outputs and enqueued urls are replayed
+        """
+        state = self.owner.state
+        for next_url in self.__iter_urls__():
+            known = state.lookup(self.id_group, next_url)
+            if known is None or known[1] != state.run_id:
+                raw, content = self.owner.__fetch_raw__(next_url, self)
+                content_hash = state.hash(content)
+                if known is None or known[0] != content_hash:
+                    self.owner.__load_document__(self.owner.__parse_raw__(next_url, raw, self))
+                    self.current_url = next_url
+                    xinfo("[INFO] Extracting data from url: " + next_url +
+                          " | thread_id: " + str(threading.get_ident()))
+                    self.recording = []
+                    try:
+                        outputs = list(self.__iter_blocks__())
+                        state.record(self.id_group, next_url, content_hash, outputs, self.recording)
+                    finally:
+                        self.recording = None
+                    yield from outputs
+                    continue
+                state.touch(self.id_group, next_url)
+
+            outputs, enqueued = state.load(self.id_group, next_url)
+            for enqueued_url, priority, id_group in enqueued:
+                self.enqueue(enqueued_url, priority, id_group)
+            yield from outputs
+
+    def iter_result(self):
+        """
+        Yield the output of every scrape function page by page without accumulating it
+        """
+        if self.owner.state is not None:
+            yield from self.__iter_stateful__()
+            return
+
+        if self.prefetch_depth > 0 and self.owner.prefetchable:
+            for next_url, document in self.__iter_prefetched__():
+                self.owner.__load_document__(document)
+                self.current_url = next_url
+                xinfo("[INFO] Extracting data from url: " + next_url + " | thread_id: " + str(threading.get_ident()))
+                yield from self.__iter_blocks__()
+            return
+
+        for next_url in self.__iter_urls__():
+            self.owner.__prepare_document__(next_url, self)
+            self.current_url = next_url
+            xinfo("[INFO] Extracting data from url: " + next_url + " | thread_id: " + str(threading.get_ident()))
+            yield from self.__iter_blocks__()
+
+    def compute_result(self):
+        for res in self.iter_result():
+            self.owner.accumulator.add(res)
 
     def then(self: X_SCRAPER):
         return self.owner
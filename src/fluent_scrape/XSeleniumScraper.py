@@ -1,27 +1,123 @@
-from typing import Literal
+import re
+import time
+from typing import Any, Callable, Literal
+from urllib.parse import urlsplit
 
-from selenium.common import TimeoutException
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.firefox.service import Service as FirefoxService
+from selenium.common import TimeoutException, WebDriverException, NoSuchElementException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from seleniumwire.webdriver import Chrome, Firefox
+from lxml import html
 
-from . import XScraper, XScraperElement, XScraperGroup
+from . import XScraper, XScraperElement, XScraperGroup, XCloudScraperElement, XExtractionPlan, xpath_cache, xinfo
+from .xpath_cache import __bind_variables__
 
 supported_browser = Literal["chrome", "firefox"]
+resource_type = Literal["image", "font", "media", "stylesheet"]
+page_load_strategy_type = Literal["normal", "eager", "none"]
+
+resource_extensions: dict[str, tuple[str, ...]] = {
+    "image": (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico", ".bmp", ".avif"),
+    "font": (".woff", ".woff2", ".ttf", ".otf", ".eot"),
+    "media": (".mp4", ".webm", ".mp3", ".ogg", ".wav", ".m4a", ".mov", ".avi", ".m3u8", ".ts"),
+    "stylesheet": (".css",)
+}
+
+# Sec-Fetch-Dest values and leading Accept media types of each resource type, for urls without an extension
+resource_destinations: dict[str, tuple[str, ...]] = {
+    "image": ("image",),
+    "font": ("font",),
+    "media": ("audio", "video", "track"),
+    "stylesheet": ("style",)
+}
+resource_accept_types: dict[str, tuple[str, ...]] = {
+    "image": ("image/",),
+    "font": ("font/", "application/font-", "application/x-font-"),
+    "media": ("audio/", "video/"),
+    "stylesheet": ("text/css",)
+}
+
+tracking_domains: list[str] = [
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "googleadservices.com",
+    "doubleclick.net", "adservice.google.com", "facebook.net", "connect.facebook.net", "scorecardresearch.com",
+    "quantserve.com", "hotjar.com", "criteo.com", "taboola.com", "outbrain.com", "amazon-adsystem.com",
+    "adnxs.com", "moatads.com", "chartbeat.com", "newrelic.com", "nr-data.net"
+]
+batch_field = str | tuple[str, str | None]
+
+batch_extraction_script = """
+var root = arguments[0] || document, rowXPath = arguments[1], fields = arguments[2];
+function first(ctx, xpath) {
+    return document.evaluate(xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function value(node, attr) {
+    if (!node) return null;
+    var v;
+    if (node.nodeType !== 1) v = node.nodeValue;
+    else if (attr === null) v = node.innerText;
+    else {
+        v = node[attr];
+        if (v === undefined || v === null || typeof v === "object" || typeof v === "function") v = node.getAttribute(attr);
+    }
+    return v === undefined || v === null ? null : String(v).trim();
+}
+function extract(ctx) {
+    var out = {};
+    for (var i = 0; i < fields.length; i++) out[fields[i][0]] = value(first(ctx, fields[i][1]), fields[i][2]);
+    return out;
+}
+if (rowXPath === null) return extract(root);
+var rows = [], snapshot = document.evaluate(rowXPath, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < snapshot.snapshotLength; i++) rows.push(extract(snapshot.snapshotItem(i)));
+return rows;
+"""
+
+wait_for_any_script = """
+var root = arguments[0] || document, xpaths = arguments[1], timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1], finished = false, observer = null, timer = null;
+function match() {
+    for (var i = 0; i < xpaths.length; i++) {
+        if (document.evaluate(xpaths[i], root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue) return i;
+    }
+    return -1;
+}
+function finish(index) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    if (timer) clearTimeout(timer);
+    done(index);
+}
+var found = match();
+if (found >= 0) {
+    finish(found);
+} else {
+    observer = new MutationObserver(function () {
+        var index = match();
+        if (index >= 0) finish(index);
+    });
+    observer.observe(document.documentElement || document, {childList: true, subtree: true, attributes: true, characterData: true});
+    timer = setTimeout(function () { finish(-1); }, timeoutMs);
+}
+"""
+default_script_timeout: float = 30
 
 
 class XBrowserOptions(object):
     def __init__(self, browser_type: supported_browser = "chrome", headless: bool = True,
                  binary_location: str | None = None, driver_path: str | None = None, user_agent: str | None = None,
-                 proxy: str | None = None, additional_options: dict[str, str] = None):
+                 proxy: str | None = None, additional_options: dict[str, str] = None,
+                 block_resources: list[resource_type] | None = None, block_url_patterns: list[str] | None = None,
+                 block_domains: list[str] | None = None, page_load_strategy: page_load_strategy_type = "normal",
+                 capture_requests: bool = False):
+        """
+        block_url_patterns are regular expressions searched in the request url, block_domains also match
+        their subdomains (tracking_domains is a ready-made list). capture_requests keeps selenium-wire's
+        record of every request available on driver.requests.
+        """
         self.browser_type: supported_browser = browser_type
         self.headless: bool = headless
         self.binary_location: str | None = binary_location
@@ -29,24 +125,208 @@ class XBrowserOptions(object):
         self.user_agent: str | None = user_agent
         self.proxy: str | None = proxy
         self.additional_options: dict[str, str] = additional_options if additional_options is not None else {}
+        self.block_resources: list[resource_type] = block_resources if block_resources is not None else []
+        self.block_url_patterns: list[str] = block_url_patterns if block_url_patterns is not None else []
+        self.block_domains: list[str] = block_domains if block_domains is not None else []
+        self.page_load_strategy: page_load_strategy_type = page_load_strategy
+        self.capture_requests: bool = capture_requests
+
+    def key(self) -> tuple:
+        """
+        Hashable identity of the options, drivers launched with the same key are interchangeable
+        """
+        return (self.browser_type, self.headless, self.binary_location, self.driver_path, self.user_agent,
+                self.proxy, tuple(sorted(self.additional_options.items())), tuple(self.block_resources),
+                tuple(self.block_url_patterns), tuple(self.block_domains), self.page_load_strategy,
+                self.capture_requests)
+
+
+def __wait_for_any__(driver: WebDriver, context: WebElement | None, xpaths: list[str], timeout: float) -> int | None:
+    """
+    Wait inside the page until any xpath matches, returns the index of the first matching xpath or None on timeout
+    """
+    previous = driver.timeouts.script
+    if timeout >= previous:
+        driver.set_script_timeout(timeout + 1)
+    try:
+        index = driver.execute_async_script(wait_for_any_script, context, xpaths, int(timeout * 1000))
+    except WebDriverException:
+        # raised on script timeout or when the page navigates while waiting
+        return None
+    finally:
+        if timeout >= previous:
+            driver.set_script_timeout(previous)
+    return index if index is not None and index >= 0 else None
 
 
 def __find_elements__(driver: WebDriver, find_from: WebDriver | WebElement, by: By,
                       value: str, single_result: bool = False, timeout: float = 0) -> list[WebElement] | WebElement:
-    def get_elements_by_timeout():
-        if not single_result:
-            return WebDriverWait(driver, timeout).until(lambda _: find_from.find_elements(by, value))
-        else:
-            return WebDriverWait(driver, timeout).until(lambda _: find_from.find_element(by, value))
+    def find():
+        return find_from.find_elements(by, value) if not single_result else find_from.find_element(by, value)
 
     try:
+        found = find()
+        if found or timeout <= 0:
+            return found
+    except NoSuchElementException:
         if timeout <= 0:
-            return find_from.find_elements(by, value) if not single_result else find_from.find_element(by, value)
-        else:
-            return get_elements_by_timeout()
-    except:
+            return None
+    except WebDriverException:
         return [] if not single_result else None
 
+    if by == By.XPATH:
+        context = find_from if isinstance(find_from, WebElement) else None
+        if __wait_for_any__(driver, context, [value], timeout) is None:
+            return [] if not single_result else None
+        try:
+            return find()
+        except WebDriverException:
+            return [] if not single_result else None
+
+    try:
+        return WebDriverWait(driver, timeout).until(lambda _: find())
+    except WebDriverException:
+        return [] if not single_result else None
+
+
+def __execute_batch__(driver: WebDriver, context: WebElement | None, row_xpath: str | None,
+                      fields: dict[str, batch_field]) -> dict[str, str | None] | list[dict[str, str | None]]:
+    """
+    Extract every field (relative xpath to its text, or (xpath, attribute)) in a single script call,
+    once from context or once per row matched by row_xpath
+    """
+    script_fields = []
+    for name, field in fields.items():
+        xpath, attr = (field, None) if isinstance(field, str) else field
+        script_fields.append([name, xpath, attr])
+
+    return driver.execute_script(batch_extraction_script, context, row_xpath, script_fields)
+
+
+def __seleniumwire_options__(options: XBrowserOptions) -> dict[str, Any]:
+    seleniumwire_options: dict[str, Any] = {}
+    if options.proxy:
+        seleniumwire_options['proxy'] = {
+            'https': f'https://{options.proxy}',
+            'http': f'http://{options.proxy}'
+        }
+    if not options.capture_requests:
+        # requests still go through the interceptor but are never buffered
+        seleniumwire_options['request_storage'] = 'memory'
+        seleniumwire_options['request_storage_max_size'] = 0
+    return seleniumwire_options
+
+
+def __blocked_resource__(request: Any, destinations: tuple[str, ...], accept_types: tuple[str, ...]) -> bool:
+    """
+    Whether the request fetches a blocked resource type according to its Sec-Fetch-Dest header,
+    or to the first media type it accepts when the browser does not send Sec-Fetch-Dest
+    """
+    destination = request.headers.get("Sec-Fetch-Dest")
+    if destination:
+        return destination.lower() in destinations
+    accept = (request.headers.get("Accept") or "").split(",")[0].strip().lower()
+    return accept.startswith(accept_types)
+
+
+def __request_interceptor__(options: XBrowserOptions) -> Callable[[Any], None] | None:
+    """
+    Build the selenium-wire interceptor aborting blocked requests, None when nothing is blocked.
+    Resource types are recognized by the url extension and by the request headers
+    """
+    extensions = tuple(ext for resource in options.block_resources for ext in resource_extensions[resource])
+    destinations = tuple(d for resource in options.block_resources for d in resource_destinations[resource])
+    accept_types = tuple(t for resource in options.block_resources for t in resource_accept_types[resource])
+    patterns = [re.compile(pattern) for pattern in options.block_url_patterns]
+    domains = tuple(domain.lower() for domain in options.block_domains)
+    subdomains = tuple("." + domain for domain in domains)
+    if not extensions and not patterns and not domains:
+        return None
+
+    def interceptor(request):
+        parts = urlsplit(request.url)
+        host = (parts.hostname or "").lower()
+        if (extensions and parts.path.lower().endswith(extensions)) \
+                or (destinations and __blocked_resource__(request, destinations, accept_types)) \
+                or (domains and (host in domains or host.endswith(subdomains))) \
+                or any(pattern.search(request.url) for pattern in patterns):
+            request.abort()
+
+    return interceptor
+
+
+def __create_driver__(options: XBrowserOptions) -> WebDriver:
+    """
+    Launch a new browser configured by options, the selenium-wire stack and the driver modules of the browser
+    are only imported here
+    """
+    match options.browser_type:
+        case "chrome":
+            from selenium.webdriver.chrome.options import Options as ChromeOptions
+            from selenium.webdriver.chrome.service import Service as ChromeService
+            from seleniumwire.webdriver import Chrome
+
+            chrome_options = ChromeOptions()
+            chrome_options.headless = options.headless
+            chrome_options.page_load_strategy = options.page_load_strategy
+            if options.binary_location:
+                chrome_options.binary_location = options.binary_location
+            chrome_options.add_argument(f"user-agent={options.user_agent}")
+            if options.headless:
+                chrome_options.add_argument("--no-sandbox")
+                chrome_options.add_argument("--disable-dev-shm-usage")
+                chrome_options.add_argument("--disable-gpu")
+            if "image" in options.block_resources:
+                chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+                chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+            for key, value in options.additional_options.items():
+                chrome_options.add_argument(f"{key}={value}")
+
+            service: ChromeService | None = None
+            if options.driver_path:
+                service = ChromeService(options.driver_path)
+
+            driver = Chrome(service=service, options=chrome_options,
+                            seleniumwire_options=__seleniumwire_options__(options))
+        case "firefox":
+            from selenium.webdriver.firefox.options import Options as FirefoxOptions
+            from selenium.webdriver.firefox.service import Service as FirefoxService
+            from seleniumwire.webdriver import Firefox
+
+            firefox_options = FirefoxOptions()
+            firefox_options.headless = options.headless
+            firefox_options.page_load_strategy = options.page_load_strategy
+            if options.binary_location:
+                firefox_options.binary_location = options.binary_location
+            firefox_options.add_argument(f"user-agent={options.user_agent}")
+            if options.headless:
+                firefox_options.add_argument("--no-sandbox")
+                firefox_options.add_argument("--disable-dev-shm-usage")
+                firefox_options.add_argument("--single-process")
+                firefox_options.add_argument("--disable-gpu")
+                firefox_options.add_argument("--window-size=1920x1080")
+                firefox_options.add_argument("--start-maximized")
+            if "image" in options.block_resources:
+                firefox_options.set_preference("permissions.default.image", 2)
+
+            for key, value in options.additional_options.items():
+                firefox_options.add_argument(f"{key}={value}")
+
+            service: FirefoxService | None = None
+            if options.driver_path:
+                service = FirefoxService(options.driver_path)
+
+            driver = Firefox(service=service, options=firefox_options,
+                             seleniumwire_options=__seleniumwire_options__(options))
+        case _:
+            raise Exception("Unsupported browser type")
+
+    interceptor = __request_interceptor__(options)
+    if interceptor is not None:
+        driver.request_interceptor = interceptor
+    return driver
+
 
 class XSeleniumScraperElement(XScraperElement['XSeleniumScraper', WebElement]):
     def __init__(self, scraper: 'XSeleniumScraper', native_element: WebElement | None):
@@ -61,119 +341,218 @@ class XSeleniumScraperElement(XScraperElement['XSeleniumScraper', WebElement]):
     def get_html(self) -> str:
         return self.get_attribute("outerHTML")
 
-    def get_multiple_by_xpath(self, xpath: str, timeout: float = 0):
+    def get_multiple_by_xpath(self, xpath: str, timeout: float = 0, **variables):
+        self.__scraper__.xpath_queries += 1
+        xpath = __bind_variables__(xpath, **variables)
         res = []
         for e in __find_elements__(self.__scraper__.driver, self.native_element, By.XPATH, xpath, timeout=timeout):
             res.append(XSeleniumScraperElement(self.__scraper__, e))
         return res
 
-    def get_single_by_xpath(self, xpath: str, timeout: float = 0):
+    def get_single_by_xpath(self, xpath: str, timeout: float = 0, **variables):
+        self.__scraper__.xpath_queries += 1
+        xpath = __bind_variables__(xpath, **variables)
         el = __find_elements__(self.__scraper__.driver, self.native_element, By.XPATH, xpath, True, timeout=timeout)
         return XSeleniumScraperElement(self.__scraper__, el) if el is not None else None
 
+    def get_batch(self, fields: dict[str, batch_field]) -> dict[str, str | None]:
+        """
+        Get every field relative to this element in a single round trip, missing values are None
+        """
+        if self.native_element is None:
+            return {name: None for name in fields}
+        return __execute_batch__(self.__scraper__.driver, self.native_element, None, fields)
+
+    def get_rows(self, row_xpath: str, fields: dict[str, batch_field]) -> list[dict[str, str | None]]:
+        """
+        Get every field of every row relative to this element in a single round trip
+        """
+        if self.native_element is None:
+            return []
+        return __execute_batch__(self.__scraper__.driver, self.native_element, row_xpath, fields)
+
 
 class XSeleniumScraper(XScraper[XSeleniumScraperElement]):
 
-    def __init__(self, options: XBrowserOptions):
+    def __init__(self, options: XBrowserOptions, snapshot: bool = False, snapshot_wait_xpath: str | None = None,
+                 snapshot_wait_timeout: float = 10, pool: 'XBrowserPool | None' = None):
+        """
+        With snapshot enabled the rendered DOM is captured once per page and every lookup runs locally with lxml,
+        elements are then XCloudScraperElement. Interactions such as click_element invalidate the snapshot.
+        With a pool the driver is leased when the first page is loaded and returned once the scraper is done.
+        """
         self.driver: WebDriver | None = None
         self.options: XBrowserOptions = options
+        self.pool: 'XBrowserPool | None' = pool
+        self.pages: int = 0
+        self.origins: set[str] = set()
+        self.snapshot: bool = snapshot
+        self.snapshot_wait_xpath: str | None = snapshot_wait_xpath
+        self.snapshot_wait_timeout: float = snapshot_wait_timeout
+        self.tree: Any = None
         super().__init__()
 
     def __initialize_impl__(self):
-        match self.options.browser_type:
-            case "chrome":
-                chrome_options = ChromeOptions()
-                chrome_options.headless = self.options.headless
-                if self.options.binary_location:
-                    chrome_options.binary_location = self.options.binary_location
-                chrome_options.add_argument(f"user-agent={self.options.user_agent}")
-                if self.options.headless:
-                    chrome_options.add_argument("--no-sandbox")
-                    chrome_options.add_argument("--disable-dev-shm-usage")
-                    chrome_options.add_argument("--disable-gpu")
-
-                for key, value in self.options.additional_options.items():
-                    chrome_options.add_argument(f"{key}={value}")
-
-                options_proxy: dict | None = None
-                if self.options.proxy:
-                    options_proxy = {
-                        'proxy': {
-                            'https': f'https://{self.options.proxy}',
-                            'http': f'http://{self.options.proxy}'
-                        }
-                    }
-
-                service: ChromeService | None = None
-                if self.options.driver_path:
-                    service = ChromeService(self.options.driver_path)
-
-                self.driver = Chrome(service=service, options=chrome_options, seleniumwire_options=options_proxy)
-            case "firefox":
-                firefox_options = FirefoxOptions()
-                firefox_options.headless = self.options.headless
-                if self.options.binary_location:
-                    firefox_options.binary_location = self.options.binary_location
-                firefox_options.add_argument(f"user-agent={self.options.user_agent}")
-                if self.options.headless:
-                    firefox_options.add_argument("--no-sandbox")
-                    firefox_options.add_argument("--disable-dev-shm-usage")
-                    firefox_options.add_argument("--single-process")
-                    firefox_options.add_argument("--disable-gpu")
-                    firefox_options.add_argument("--window-size=1920x1080")
-                    firefox_options.add_argument("--start-maximized")
-
-                for key, value in self.options.additional_options.items():
-                    firefox_options.add_argument(f"{key}={value}")
-
-                options_proxy: dict | None = None
-                if self.options.proxy:
-                    options_proxy = {
-                        'proxy': {
-                            'https': f'https://{self.options.proxy}',
-                            'http': f'http://{self.options.proxy}'
-                        }
-                    }
-
-                service: FirefoxService | None = None
-                if self.options.driver_path:
-                    service = FirefoxService(self.options.driver_path)
-
-                self.driver = Firefox(service=service, options=firefox_options, seleniumwire_options=options_proxy)
-            case _:
-                raise Exception("Unsupported browser type")
+        if self.pool is None:
+            self.driver = __create_driver__(self.options)
+
+    def __finish__(self, error: BaseException | None = None):
+        if self.pool is not None and self.driver is not None:
+            self.__release__(isinstance(error, WebDriverException))
+
+    def __lease__(self) -> 'XSeleniumScraper':
+        self.driver = self.pool.lease(self.options)
+        self.pages = 0
+        self.origins = set()
+        return self
+
+    def __release__(self, crashed: bool = False) -> 'XSeleniumScraper':
+        self.pool.release(self.driver, self.pages, crashed, self.origins)
+        self.driver = None
+        self.invalidate_snapshot()
+        return self
+
+    def close(self):
+        """
+        Quit the browser, pooled drivers are owned by the pool
+        """
+        if self.pool is None and self.driver is not None:
+            self.driver.quit()
+            self.driver = None
 
     def global_headers(self, headers: dict[str, str]):
         print("Warning: Headers not supported in selenium scraper")
         return self
 
     def __prepare_document__(self, url: str, x_group: XScraperGroup = None) -> 'XSeleniumScraper':
+        id_group = x_group.id_group if x_group is not None else None
+        if self.driver is None and self.pool is not None:
+            self.__lease__()
+        start = time.perf_counter()
         self.driver.get(url)
+        if self.metrics is not None:
+            self.metrics.record_fetch(id_group, url, time.perf_counter() - start)
+        self.pages += 1
+        if self.pool is not None:
+            self.origins.update((url, self.driver.current_url))
+        self.invalidate_snapshot()
+        if self.snapshot:
+            if self.snapshot_wait_xpath:
+                __find_elements__(self.driver, self.driver, By.XPATH, self.snapshot_wait_xpath, True,
+                                  timeout=self.snapshot_wait_timeout)
+            start = time.perf_counter()
+            self.take_snapshot()
+            if self.metrics is not None:
+                self.metrics.record_parse(id_group, url, time.perf_counter() - start)
+        return self
+
+    def __fetch_raw__(self, url: str, x_group: XScraperGroup = None) -> tuple[Any, bytes]:
+        """
+        Pages are rendered in the browser, only the rendered source is returned to be hashed
+        """
+        self.__prepare_document__(url, x_group)
+        return None, self.driver.page_source.encode()
+
+    def __parse_raw__(self, url: str, raw: Any, x_group: XScraperGroup = None) -> Any:
+        return raw
+
+    def __load_document__(self, document: Any) -> 'XSeleniumScraper':
+        # the rendered page is already the current document
+        return self
+
+    def take_snapshot(self) -> 'XSeleniumScraper':
+        """
+        Capture the current DOM into an lxml tree
+        """
+        self.tree = html.fromstring(self.driver.page_source)
         return self
 
-    def get_elements(self, xpath: str, timeout: float = 0) -> list[XSeleniumScraperElement]:
+    def invalidate_snapshot(self) -> 'XSeleniumScraper':
+        self.tree = None
+        return self
+
+    def __snapshot_elements__(self, xpath: str, timeout: float, **variables) -> list[Any]:
+        if self.tree is None:
+            self.take_snapshot()
+
+        elements = xpath_cache.evaluate(self.tree, xpath, **variables)
+        if len(elements) == 0 and timeout > 0:
+            # the element may still be rendering, wait on the live page then capture again
+            if __find_elements__(self.driver, self.driver, By.XPATH, xpath, True, timeout=timeout) is not None:
+                self.take_snapshot()
+                elements = xpath_cache.evaluate(self.tree, xpath, **variables)
+        return elements
+
+    def get_elements(self, xpath: str, timeout: float = 0,
+                     **variables) -> list[XSeleniumScraperElement | XCloudScraperElement]:
+        self.xpath_queries += 1
+        if self.snapshot:
+            return [XCloudScraperElement(self, e) for e in self.__snapshot_elements__(xpath, timeout, **variables)]
+
+        xpath = __bind_variables__(xpath, **variables)
         elements: list[WebElement] = __find_elements__(self.driver, self.driver, By.XPATH, xpath, timeout=timeout)
         return [XSeleniumScraperElement(self, e) for e in elements]
 
-    def get_element(self, xpath: str, timeout: float = 0) -> XSeleniumScraperElement:
+    def get_element(self, xpath: str, timeout: float = 0,
+                    **variables) -> XSeleniumScraperElement | XCloudScraperElement:
+        self.xpath_queries += 1
+        if self.snapshot:
+            elements = self.__snapshot_elements__(xpath, timeout, **variables)
+            if len(elements) == 0:
+                xinfo(f"Could not find element with xpath: {xpath}")
+                return XCloudScraperElement(self, None)
+            return XCloudScraperElement(self, elements[0])
+
+        xpath = __bind_variables__(xpath, **variables)
         element: WebElement = __find_elements__(self.driver, self.driver, By.XPATH, xpath, True, timeout=timeout)
         if not element:
-            print(f"Could not find element with xpath: {xpath}")
+            xinfo(f"Could not find element with xpath: {xpath}")
             return XSeleniumScraperElement(self, None)
 
         return XSeleniumScraperElement(self, element)
 
+    def get_batch(self, fields: dict[str, batch_field]) -> dict[str, str | None]:
+        """
+        Get every field of the page in a single round trip, missing values are None
+        """
+        return __execute_batch__(self.driver, None, None, fields)
+
+    def get_rows(self, row_xpath: str, fields: dict[str, batch_field]) -> list[dict[str, str | None]]:
+        """
+        Get every field of every row matched by row_xpath in a single round trip
+        """
+        return __execute_batch__(self.driver, None, row_xpath, fields)
+
+    def extract(self, plan: XExtractionPlan) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Run the plan on the snapshot in snapshot mode, otherwise in a single batch script
+        """
+        self.xpath_queries += 1
+        if self.snapshot:
+            if self.tree is None:
+                self.take_snapshot()
+            return plan.run_tree(self.tree, self.__failure_hook__())
+        return plan.run_raw(__execute_batch__(self.driver, None, plan.row_xpath, plan.batch_fields()),
+                            self.__failure_hook__())
+
+    def wait_for_any(self, xpaths: list[str], timeout: float = 10) -> int | None:
+        """
+        Wait until any of the xpaths matches, returns the index of the matching xpath or None on timeout
+        """
+        return __wait_for_any__(self.driver, None, xpaths, timeout)
+
     def click_element(self, xpath: str):
         try:
             element: WebElement = WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable((By.XPATH, xpath)))
             if not element:
-                print(f"Could not find element with xpath: {xpath}")
+                xinfo(f"Could not find element with xpath: {xpath}")
                 return False
 
             self.driver.execute_script("arguments[0].click();", element)
+            self.invalidate_snapshot()
             return True
         except TimeoutException:
-            print(f"Could not find element with xpath: {xpath}")
+            xinfo(f"Could not find element with xpath: {xpath}")
             return False
 
     def get_cookies(self) -> dict[str, str]:
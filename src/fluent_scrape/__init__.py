@@ -1,5 +1,81 @@
+from .metrics import *
 from .value_converter import *
+from .result_accumulator import *
+from .crawl_state import *
+from .task_queue import *
 from .XScraper import *
-from .XCloudScraper import *
-from .XSeleniumScraper import *
+from .sinks import *
+from .xpath_cache import *
+from .extraction_plan import *
+from .response_cache import *
+from .frontier import *
+from .queue_worker import *
 
+__core__ = [name for name in globals() if not name.startswith("_")]
+
+import importlib
+import sys
+import types
+from typing import Any
+
+# backends are imported on first use so that http only workers never load the browser stack,
+# fluent_scrape.http and fluent_scrape.browser export the core with one family of backends
+__lazy_modules__: dict[str, tuple[str, ...]] = {
+    "session_pool": ("XSessionPool",),
+    "host_controller": ("XHostState", "XHostController"),
+    "XCloudScraper": ("XCloudScraperElement", "XCloudScraper"),
+    "XAsyncScraper": ("XAsyncLimiter", "XAsyncScraper", "xmerge_async"),
+    "process_pipeline": ("scrape_fn_type", "scrape_registry", "xscrape_fn", "XGroupSpec", "XDocumentScraper",
+                         "XEnqueueRecorder", "XProcessPipeline"),
+    "XSeleniumScraper": ("supported_browser", "resource_type", "page_load_strategy_type", "resource_extensions",
+                         "resource_destinations", "resource_accept_types", "tracking_domains", "batch_field",
+                         "batch_extraction_script", "wait_for_any_script", "default_script_timeout", "XBrowserOptions",
+                         "XSeleniumScraperElement", "XSeleniumScraper"),
+    "browser_pool": ("XPooledDriver", "XBrowserPool"),
+    "XHybridScraper": ("detector_type", "challenge_markers", "xblocked_status", "xblocked_markers",
+                       "xmissing_anchors", "XHybridScraper")
+}
+__lazy_names__: dict[str, str] = {name: module for module, names in __lazy_modules__.items() for name in names}
+__http_modules__ = ("session_pool", "host_controller", "XCloudScraper", "XAsyncScraper", "process_pipeline")
+__browser_modules__ = ("XSeleniumScraper", "browser_pool", "XHybridScraper")
+
+__all__ = __core__ + list(__lazy_names__)
+
+
+class __XPackage__(types.ModuleType):
+    def __setattr__(self, name: str, value: Any):
+        # importing a submodule binds its name on the package, the class of the same name is bound instead
+        if isinstance(value, types.ModuleType) and value.__name__ == f"{self.__name__}.{name}" \
+                and hasattr(value, name):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = __XPackage__
+
+
+def __getattr__(name: str) -> Any:
+    module_name = __lazy_names__.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module("." + module_name, __name__)
+    globals()[name] = getattr(module, name)
+    return globals()[name]
+
+
+def __entry_point__(namespace: dict[str, Any], *module_names: str):
+    """
+    Fill the namespace of an entry point module with the core and, on first use, the names of module_names
+    """
+    names = [name for module_name in module_names for name in __lazy_modules__[module_name]]
+    namespace.update({name: globals()[name] for name in __core__})
+    namespace["__all__"] = __core__ + names
+
+    def load(name: str) -> Any:
+        if name not in names:
+            raise AttributeError(f"module {namespace['__name__']!r} has no attribute {name!r}")
+        namespace[name] = __getattr__(name)
+        return namespace[name]
+
+    namespace["__getattr__"] = load
@@ -0,0 +1,8 @@
+"""
+Core and browser backends (XSeleniumScraper, XBrowserPool, XHybridScraper) along with the http backends they build on
+
+    from fluent_scrape.browser import *
+"""
+from . import __entry_point__, __http_modules__, __browser_modules__
+
+__entry_point__(globals(), *__http_modules__, *__browser_modules__)
@@ -0,0 +1,245 @@
+import threading
+from typing import Any, Iterable
+from urllib.parse import urlsplit
+
+from selenium.common import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from . import XBrowserOptions
+from .XSeleniumScraper import __create_driver__
+
+
+def __process_tree_rss_mb__(pid: int) -> float | None:
+    """
+    Resident memory of a process and all its children in MB, None where /proc is not available
+    """
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        curr = pending.pop()
+        try:
+            with open(f"/proc/{curr}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            with open(f"/proc/{curr}/task/{curr}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            if curr == pid:
+                return None
+    return total_kb / 1024
+
+
+def __origin__(url: str | None) -> str | None:
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class XPooledDriver(object):
+    def __init__(self, driver: WebDriver, key: tuple):
+        self.driver: WebDriver = driver
+        self.key: tuple = key
+        self.pages: int = 0
+        self.leases: int = 0
+        self.origins: set[str] = set()
+
+
+class XBrowserPool(object):
+    """
+    Pool of pre-started drivers keyed by XBrowserOptions.
+    Drivers are cleaned between leases and recycled after max_pages, on crash or above max_rss_mb.
+    Only Chromium drivers can be cleaned, through CDP, other drivers are recycled after every lease.
+    """
+
+    def __init__(self, max_drivers: int = 4, max_pages: int = 200, max_rss_mb: float | None = None):
+        self.max_drivers: int = max_drivers
+        self.max_pages: int = max_pages
+        self.max_rss_mb: float | None = max_rss_mb
+        self.idle: dict[tuple, list[XPooledDriver]] = {}
+        self.leased: dict[int, XPooledDriver] = {}
+        self.size: int = 0
+        self.launched: int = 0
+        self.recycled: int = 0
+        self.closed: bool = False
+        self.condition = threading.Condition()
+
+    def warm(self, options: XBrowserOptions, count: int) -> 'XBrowserPool':
+        """
+        Start up to count drivers ahead of time, never more than the free slots of the pool
+        """
+        key = options.key()
+        with self.condition:
+            if self.closed:
+                raise Exception("Browser pool is closed")
+            count = max(0, min(count, self.max_drivers - self.size))
+            self.size += count
+
+        started = 0
+        try:
+            for _ in range(count):
+                pooled = XPooledDriver(__create_driver__(options), key)
+                started += 1
+                with self.condition:
+                    self.launched += 1
+                    self.idle.setdefault(key, []).append(pooled)
+                    self.condition.notify()
+        finally:
+            if started < count:
+                with self.condition:
+                    self.size -= count - started
+                    self.condition.notify_all()
+        return self
+
+    def lease(self, options: XBrowserOptions, timeout: float | None = None) -> WebDriver:
+        key = options.key()
+        evicted: XPooledDriver | None = None
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise Exception("Browser pool is closed")
+
+                idle = self.idle.get(key)
+                if idle:
+                    pooled = idle.pop()
+                    break
+
+                if self.size < self.max_drivers:
+                    pooled = None
+                    self.size += 1
+                    break
+
+                # a driver idle for other options makes room for this one
+                evicted = self.__pop_other_idle__(key)
+                if evicted is not None:
+                    pooled = None
+                    break
+
+                if not self.condition.wait(timeout):
+                    raise Exception("Timed out waiting for a browser from the pool")
+
+        if evicted is not None:
+            self.__quit__(evicted)
+
+        if pooled is None:
+            try:
+                pooled = XPooledDriver(__create_driver__(options), key)
+            except BaseException:
+                with self.condition:
+                    self.size -= 1
+                    self.condition.notify()
+                raise
+            with self.condition:
+                self.launched += 1
+
+        pooled.leases += 1
+        with self.condition:
+            self.leased[id(pooled.driver)] = pooled
+        return pooled.driver
+
+    def release(self, driver: WebDriver, pages: int = 0, crashed: bool = False, origins: Iterable[str] = ()):
+        """
+        Return a leased driver, it is cleaned for the next lease or quit if it has to be recycled.
+        origins are the urls or origins visited during the lease, their storage is cleared
+        """
+        with self.condition:
+            pooled = self.leased.pop(id(driver))
+        pooled.pages += pages
+        pooled.origins.update(o for o in map(__origin__, origins) if o is not None)
+
+        recycle = crashed or self.closed or pooled.pages >= self.max_pages or self.__over_memory__(pooled)
+        if not recycle:
+            try:
+                recycle = not self.__reset__(pooled)
+            except WebDriverException:
+                recycle = True
+
+        if recycle:
+            self.__quit__(pooled)
+            with self.condition:
+                self.size -= 1
+                self.recycled += 1
+                self.condition.notify()
+            return
+
+        with self.condition:
+            self.idle.setdefault(pooled.key, []).append(pooled)
+            self.condition.notify()
+
+    def __pop_other_idle__(self, key: tuple) -> XPooledDriver | None:
+        for other_key, idle in self.idle.items():
+            if other_key != key and idle:
+                return idle.pop()
+        return None
+
+    def __over_memory__(self, pooled: XPooledDriver) -> bool:
+        if self.max_rss_mb is None:
+            return False
+
+        process = getattr(getattr(pooled.driver, "service", None), "process", None)
+        if process is None:
+            return False
+        rss = __process_tree_rss_mb__(process.pid)
+        return rss is not None and rss > self.max_rss_mb
+
+    @staticmethod
+    def __reset__(pooled: XPooledDriver) -> bool:
+        """
+        Clear the cookies of every site and the storage of every origin visited during the lease, then continue
+        in a fresh tab so session storage and history are gone. False when the driver cannot be cleaned
+        """
+        driver = pooled.driver
+        if not hasattr(driver, "execute_cdp_cmd"):
+            return False
+
+        origins = set(pooled.origins)
+        origins.add(__origin__(driver.current_url))
+        if hasattr(driver, "requests"):
+            # selenium-wire's record also holds the origins of frames and subresources
+            origins.update(__origin__(request.url) for request in driver.requests)
+            del driver.requests
+        origins.discard(None)
+
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        pooled.origins.clear()
+
+        old_handles = list(driver.window_handles)
+        driver.switch_to.new_window("tab")
+        new_handle = driver.current_window_handle
+        for handle in old_handles:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(new_handle)
+        return True
+
+    @staticmethod
+    def __quit__(pooled: XPooledDriver):
+        try:
+            pooled.driver.quit()
+        except WebDriverException:
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        with self.condition:
+            return {
+                "size": self.size,
+                "idle": sum(len(idle) for idle in self.idle.values()),
+                "leased": len(self.leased),
+                "launched": self.launched,
+                "recycled": self.recycled
+            }
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            idle_drivers = [pooled for idle in self.idle.values() for pooled in idle]
+            self.idle = {}
+            self.size -= len(idle_drivers)
+            self.condition.notify_all()
+
+        for pooled in idle_drivers:
+            self.__quit__(pooled)
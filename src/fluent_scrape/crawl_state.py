@@ -0,0 +1,137 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any
+
+
+class XCrawlState(object):
+    """
+    On-disk crawl state backed by SQLite: for every url the content hash, the outputs of the scrape functions
+    and the urls they enqueued. A run left unfinished is resumed by the next one, pages it already processed
+    are replayed from the stored outputs; on a new run pages whose content hash did not change are not parsed.
+    Scrapers sharing a state and a job share the run, it is finished when the last of them is done.
+    """
+
+    def __init__(self, path: str, job: str = "default"):
+        self.path: str = path
+        self.job: str = job
+        self.run_id: int | None = None
+        self.active: int = 0
+        self.failed: bool = False
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "job TEXT, run_id INTEGER, started_at REAL, finished_at REAL, PRIMARY KEY (job, run_id))"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "job TEXT, id_group TEXT, url TEXT, content_hash TEXT, outputs BLOB, enqueued BLOB, run_id INTEGER, "
+            "updated_at REAL, PRIMARY KEY (job, id_group, url))"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def hash(content: bytes) -> str:
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+    def begin(self) -> int:
+        """
+        Resume the unfinished run of the job or start a new one
+        """
+        with self.lock:
+            self.active += 1
+            if self.run_id is not None:
+                return self.run_id
+
+            row = self.connection.execute(
+                "SELECT run_id FROM runs WHERE job = ? AND finished_at IS NULL ORDER BY run_id DESC LIMIT 1",
+                (self.job,)
+            ).fetchone()
+            if row is not None:
+                self.run_id = row[0]
+                return self.run_id
+
+            last = self.connection.execute("SELECT COALESCE(MAX(run_id), 0) FROM runs WHERE job = ?",
+                                           (self.job,)).fetchone()[0]
+            self.run_id = last + 1
+            self.connection.execute("INSERT INTO runs VALUES (?, ?, ?, NULL)", (self.job, self.run_id, time.time()))
+            self.connection.commit()
+            return self.run_id
+
+    def finish(self, completed: bool = True):
+        """
+        Release the run, it is marked finished once every scraper sharing it completed
+        """
+        with self.lock:
+            self.active -= 1
+            self.failed = self.failed or not completed
+            if self.active > 0 or self.run_id is None:
+                return
+            if self.failed:
+                # left unfinished so the next run resumes it
+                self.failed = False
+                self.run_id = None
+                return
+            self.connection.execute("UPDATE runs SET finished_at = ? WHERE job = ? AND run_id = ?",
+                                    (time.time(), self.job, self.run_id))
+            self.connection.commit()
+            self.run_id = None
+
+    def lookup(self, id_group: str, url: str) -> tuple[str, int] | None:
+        """
+        Content hash of the url and the run that last processed it
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT content_hash, run_id FROM pages WHERE job = ? AND id_group = ? AND url = ?",
+                (self.job, id_group, url)
+            ).fetchone()
+
+    def load(self, id_group: str, url: str) -> tuple[list[Any], list[tuple[str, int, str | None]]]:
+        """
+        Stored outputs and enqueued urls of the url
+        """
+        with self.lock:
+            outputs, enqueued = self.connection.execute(
+                "SELECT outputs, enqueued FROM pages WHERE job = ? AND id_group = ? AND url = ?",
+                (self.job, id_group, url)
+            ).fetchone()
+        return pickle.loads(outputs), pickle.loads(enqueued)
+
+    def record(self, id_group: str, url: str, content_hash: str, outputs: list[Any],
+               enqueued: list[tuple[str, int, str | None]]):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.job, id_group, url, content_hash, pickle.dumps(outputs), pickle.dumps(enqueued),
+                 self.run_id, time.time())
+            )
+            self.connection.commit()
+
+    def touch(self, id_group: str, url: str):
+        """
+        Mark an unchanged url as processed by the current run
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE pages SET run_id = ?, updated_at = ? WHERE job = ? AND id_group = ? AND url = ?",
+                (self.run_id, time.time(), self.job, id_group, url)
+            )
+            self.connection.commit()
+
+    def reset(self):
+        """
+        Forget every page and run of the job
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM pages WHERE job = ?", (self.job,))
+            self.connection.execute("DELETE FROM runs WHERE job = ?", (self.job,))
+            self.connection.commit()
+            self.run_id = None
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,92 @@
+from typing import Any
+
+from . import XValueConverter, failure_hook_type, xpath_cache
+
+
+class XField(object):
+    """
+    A field of an extraction plan: xpath relative to the row, converter type and arguments,
+    and the attribute to read instead of the text
+    """
+
+    def __init__(self, xpath: str, type_name: str = "str", *args, attr: str | None = None):
+        self.xpath: str = xpath
+        self.type_name: str = type_name
+        self.args: tuple = args
+        self.attr: str | None = attr
+        # string() returns the text of the first match directly, lxml creates no element for it
+        self.value_xpath: str = f"string({xpath})" if attr is None else f"string(({xpath})/@{attr})"
+
+
+def __field_value__(value: Any) -> str | None:
+    value = str(value).strip()
+    return value if value else None
+
+
+class XExtractionPlan(object):
+    """
+    Declarative extraction of named fields, once per row matched by row_xpath or once from the document.
+    Plans are scrape functions: attach them with XScraperGroup.scrape, the output is {key: rows}
+    (or the fields themselves without row_xpath), missing or empty values are None. Each field is one compiled
+    XPath per row returning its string, and each column is converted in a single convert_many call,
+    no element wrappers are created.
+    """
+
+    def __init__(self, fields: dict[str, str | XField], row_xpath: str | None = None, key: str | None = None):
+        if row_xpath is not None and key is None:
+            raise Exception("An extraction plan with a row xpath needs a key")
+
+        self.fields: dict[str, XField] = {name: XField(f) if isinstance(f, str) else f for name, f in fields.items()}
+        self.row_xpath: str | None = row_xpath
+        self.key: str | None = key
+        for field in self.fields.values():
+            XValueConverter.compile(field.type_name, *field.args)
+
+    def __call__(self, x_group: Any) -> dict[str, Any] | None:
+        extracted = x_group.owner.extract(self)
+        return {self.key: extracted} if self.key is not None else extracted
+
+    def __convert__(self, columns: dict[str, list[str | None]], size: int,
+                    failure_hook: failure_hook_type | None = None) -> list[dict[str, Any]]:
+        """
+        Convert raw columns and turn them into rows, missing values stay None
+        """
+        for name, values in columns.items():
+            field = self.fields[name]
+            if field.type_name == "str":
+                continue
+            present = [i for i, v in enumerate(values) if v is not None]
+            converted = XValueConverter.convert_many([values[i] for i in present], field.type_name, *field.args,
+                                                     failure_hook=failure_hook)
+            for i, value in zip(present, converted):
+                values[i] = value
+
+        names = list(columns.keys())
+        return [dict(zip(names, row)) for row in zip(*columns.values())] if names else [{} for _ in range(size)]
+
+    def run_tree(self, tree: Any,
+                 failure_hook: failure_hook_type | None = None) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Run the plan on an lxml tree, failures of _or_none fields are reported to failure_hook
+        """
+        rows = [tree] if self.row_xpath is None else xpath_cache.evaluate(tree, self.row_xpath)
+        columns = {}
+        for name, field in self.fields.items():
+            evaluator = xpath_cache.get(field.value_xpath)
+            columns[name] = [__field_value__(evaluator(row)) for row in rows]
+
+        converted = self.__convert__(columns, len(rows), failure_hook)
+        return converted if self.row_xpath is not None else converted[0]
+
+    def run_raw(self, raw: list[dict[str, str | None]] | dict[str, str | None],
+                failure_hook: failure_hook_type | None = None) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Convert the raw strings extracted elsewhere, e.g. by a browser batch script
+        """
+        rows = [raw] if self.row_xpath is None else raw
+        columns = {name: [row.get(name) for row in rows] for name in self.fields.keys()}
+        converted = self.__convert__(columns, len(rows), failure_hook)
+        return converted if self.row_xpath is not None else converted[0]
+
+    def batch_fields(self) -> dict[str, tuple[str, str | None]]:
+        return {name: (field.xpath, field.attr) for name, field in self.fields.items()}
@@ -0,0 +1,179 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from . import XScraper, XScraperGroup, XResultAccumulator, xinfo
+
+
+class XFrontierTask(object):
+    def __init__(self, id_group: str, url: str, priority: int, chain: bool = False):
+        self.id_group: str = id_group
+        self.url: str = url
+        self.priority: int = priority
+        self.host: str = urlsplit(url).netloc
+        # the next url of a callable group is requested once this one is done
+        self.chain: bool = chain
+
+
+class XFrontier(object):
+    """
+    Deduplicated priority queue of urls processed by a fixed pool of workers, each reusing one scraper.
+    Requests to the same host are spaced by politeness_delay (or 1 / rate_limit) and bounded by max_per_host.
+    Scrape functions submit discovered links with XScraperGroup.enqueue.
+    """
+
+    def __init__(self, scraper_maker: Callable[[], XScraper], workers: int = 4, politeness_delay: float = 0,
+                 rate_limit: float | None = None, max_per_host: int | None = None):
+        self.scraper_maker: Callable[[], XScraper] = scraper_maker
+        self.workers: int = workers
+        self.host_delay: float = max(politeness_delay, 1 / rate_limit if rate_limit else 0)
+        self.max_per_host: int | None = max_per_host
+        self.template: XScraper | None = None
+        self.template_groups: dict[str, XScraperGroup] = {}
+        self.heap: list[tuple[int, int, XFrontierTask]] = []
+        self.sequence = itertools.count()
+        self.seen: set[tuple[str, str]] = set()
+        self.host_ready_at: dict[str, float] = {}
+        self.host_active: dict[str, int] = {}
+        self.in_progress: int = 0
+        self.processed: int = 0
+        self.error: BaseException | None = None
+        self.condition = threading.Condition()
+
+    def submit(self, id_group: str, url: str, priority: int = 0, chain: bool = False) -> bool:
+        """
+        Queue url for the group id_group, higher priorities are processed first
+        """
+        if id_group not in self.template_groups:
+            raise Exception(f"Unknown group: {id_group}")
+
+        with self.condition:
+            key = (id_group, url)
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+            heapq.heappush(self.heap, (-priority, next(self.sequence), XFrontierTask(id_group, url, priority, chain)))
+            self.condition.notify()
+            return True
+
+    def __submit_next__(self, group: XScraperGroup):
+        """
+        Queue the next url of a callable group
+        """
+        next_url = group.url()
+        while next_url is not None and not self.submit(group.id_group, next_url, chain=True):
+            next_url = group.url()
+
+    def __next_task__(self) -> XFrontierTask | None:
+        with self.condition:
+            while True:
+                if self.error is not None or (not self.heap and self.in_progress == 0):
+                    self.condition.notify_all()
+                    return None
+
+                now = time.monotonic()
+                skipped = []
+                task = None
+                wait_until = None
+                while self.heap:
+                    entry = heapq.heappop(self.heap)
+                    candidate = entry[2]
+                    ready_at = self.host_ready_at.get(candidate.host, 0)
+                    busy = self.max_per_host is not None \
+                        and self.host_active.get(candidate.host, 0) >= self.max_per_host
+                    if ready_at <= now and not busy:
+                        task = candidate
+                        break
+                    skipped.append(entry)
+                    if not busy:
+                        wait_until = ready_at if wait_until is None else min(wait_until, ready_at)
+                for entry in skipped:
+                    heapq.heappush(self.heap, entry)
+
+                if task is not None:
+                    self.host_ready_at[task.host] = now + self.host_delay
+                    self.host_active[task.host] = self.host_active.get(task.host, 0) + 1
+                    self.in_progress += 1
+                    return task
+
+                self.condition.wait(None if wait_until is None else wait_until - now)
+
+    def __task_done__(self, task: XFrontierTask):
+        with self.condition:
+            self.host_active[task.host] -= 1
+            self.in_progress -= 1
+            self.processed += 1
+            self.condition.notify_all()
+
+    def __work__(self, scraper: XScraper):
+        groups: dict[str, XScraperGroup] = {}
+        error: BaseException | None = None
+        try:
+            while True:
+                task = self.__next_task__()
+                if task is None:
+                    return
+
+                try:
+                    group = groups.get(task.id_group)
+                    if group is None:
+                        group = groups[task.id_group] = self.template_groups[task.id_group].bind(scraper, self)
+
+                    scraper.__prepare_document__(task.url, group)
+                    group.current_url = task.url
+                    xinfo("[INFO] Extracting data from url: " + task.url
+                          + " | thread_id: " + str(threading.get_ident()))
+                    group.__compute_blocks__()
+                    if task.chain:
+                        self.__submit_next__(self.template_groups[task.id_group])
+                except BaseException as e:
+                    error = e
+                    with self.condition:
+                        self.error = e
+                finally:
+                    self.__task_done__(task)
+        finally:
+            scraper.__finish__(error)
+
+    def run(self, template: XScraper) -> dict[str, Any]:
+        """
+        Process every group of template, starting from their urls, and return the merged result
+        """
+        self.template = template
+        self.template_groups = {g.id_group: g for g in template.groups}
+        for group in template.groups:
+            if isinstance(group.url, str):
+                self.submit(group.id_group, group.url)
+            elif callable(group.url):
+                self.__submit_next__(group)
+            elif group.url is not None:
+                for url in group.url:
+                    self.submit(group.id_group, url)
+
+        scrapers = [self.scraper_maker() for _ in range(self.workers)]
+        for scraper in scrapers:
+            scraper.headers = {**template.headers, **scraper.headers}
+            if template.metrics is not None and scraper.metrics is None:
+                scraper.instrument(template.metrics)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.__work__, args=(scraper,)) for scraper in scrapers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+        accumulator = XResultAccumulator()
+        merge_start = time.perf_counter()
+        for scraper in scrapers:
+            accumulator.merge(scraper.result)
+        end = time.perf_counter()
+        if template.metrics is not None:
+            template.metrics.record_merge(end - merge_start)
+        xinfo(f"frontier processed {self.processed} urls with {self.workers} workers in {end - start:0.4f} seconds")
+        return accumulator.result
@@ -0,0 +1,175 @@
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+import requests
+
+
+class XHostState(object):
+    def __init__(self, limit: float):
+        self.limit: float = limit
+        self.active: int = 0
+        self.blocked_until: float = 0
+        self.latency: float | None = None
+        self.baseline: float | None = None
+        self.last_decrease: float = 0
+        self.requests: int = 0
+        self.throttled: int = 0
+        self.retries: int = 0
+
+
+def __retry_after__(response: Any) -> float | None:
+    """
+    Seconds to wait from a Retry-After header, given either in seconds or as an HTTP date
+    """
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class XHostController(object):
+    """
+    Per-host AIMD concurrency control with retries. Each host starts at initial_concurrency in-flight requests,
+    gains about one slot per window of healthy responses and is cut by decrease on 429/5xx, timeouts, errors or
+    responses slower than slow_factor times its best latency, at most once per round trip.
+    Throttled requests are retried with full-jitter exponential backoff, never sooner than Retry-After,
+    while the job's retry_budget lasts. Share one controller between the scrapers of a job.
+    """
+
+    def __init__(self, initial_concurrency: int = 2, min_concurrency: int = 1, max_concurrency: int = 32,
+                 decrease: float = 0.5, slow_factor: float = 3.0, max_retries: int = 4, retry_budget: int = 200,
+                 backoff_base: float = 0.5, backoff_max: float = 60, timeout: float | None = 30,
+                 retry_status: tuple[int, ...] = (429, 500, 502, 503, 504), raise_on_failure: bool = True):
+        # a limit below one slot would block acquire forever
+        self.min_concurrency: int = max(1, min_concurrency)
+        self.initial_concurrency: int = max(self.min_concurrency, initial_concurrency)
+        self.max_concurrency: int = max_concurrency
+        self.decrease: float = decrease
+        self.slow_factor: float = slow_factor
+        self.max_retries: int = max_retries
+        self.retry_budget: int = retry_budget
+        self.backoff_base: float = backoff_base
+        self.backoff_max: float = backoff_max
+        self.timeout: float | None = timeout
+        self.retry_status: tuple[int, ...] = retry_status
+        self.raise_on_failure: bool = raise_on_failure
+        self.hosts: dict[str, XHostState] = {}
+        self.condition = threading.Condition()
+
+    def __host__(self, host: str) -> XHostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = XHostState(self.initial_concurrency)
+        return state
+
+    def acquire(self, host: str):
+        """
+        Wait for a free slot on host and for its Retry-After pause to end
+        """
+        with self.condition:
+            state = self.__host__(host)
+            while True:
+                now = time.monotonic()
+                if state.blocked_until > now:
+                    self.condition.wait(state.blocked_until - now)
+                elif state.active >= int(state.limit):
+                    self.condition.wait()
+                else:
+                    state.active += 1
+                    state.requests += 1
+                    return
+
+    def release(self, host: str, latency: float, overloaded: bool, retry_after: float | None = None):
+        with self.condition:
+            state = self.__host__(host)
+            state.active -= 1
+            now = time.monotonic()
+            if retry_after is not None:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+
+            slow = state.baseline is not None and latency > state.baseline * self.slow_factor
+            if overloaded or slow:
+                state.throttled += 1
+                # in-flight requests fail together, cut once per round trip
+                if now - state.last_decrease > (state.latency or latency):
+                    state.limit = max(self.min_concurrency, state.limit * self.decrease)
+                    state.last_decrease = now
+            else:
+                state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                state.baseline = state.latency if state.baseline is None else min(state.baseline, state.latency)
+            self.condition.notify_all()
+
+    def __backoff__(self, attempt: int, retry_after: float | None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    def __take_retry__(self, host: str) -> bool:
+        with self.condition:
+            if self.retry_budget <= 0:
+                return False
+            self.retry_budget -= 1
+            self.__host__(host).retries += 1
+            return True
+
+    def fetch(self, url: str, fetch_fn: Callable[[], Any]) -> Any:
+        """
+        Run fetch_fn within the host's concurrency limit, retrying throttled responses and timeouts
+        """
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.acquire(host)
+            start = time.monotonic()
+            response = None
+            error: BaseException | None = None
+            try:
+                response = fetch_fn()
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = e
+            except BaseException:
+                self.release(host, time.monotonic() - start, True)
+                raise
+
+            overloaded = error is not None or response.status_code in self.retry_status
+            retry_after = __retry_after__(response) if response is not None else None
+            self.release(host, time.monotonic() - start, overloaded, retry_after)
+            if not overloaded:
+                return response
+
+            if attempt >= self.max_retries or not self.__take_retry__(host):
+                if error is not None:
+                    raise error
+                if self.raise_on_failure:
+                    raise Exception(f"Giving up on {url} after {attempt + 1} attempts, status {response.status_code}")
+                return response
+
+            if response is not None:
+                response.close()
+            time.sleep(self.__backoff__(attempt, retry_after))
+            attempt += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self.condition:
+            return {
+                "retry_budget": self.retry_budget,
+                "hosts": {host: {
+                    "limit": round(s.limit, 2),
+                    "active": s.active,
+                    "latency": s.latency,
+                    "requests": s.requests,
+                    "throttled": s.throttled,
+                    "retries": s.retries
+                } for host, s in self.hosts.items()}
+            }
@@ -0,0 +1,8 @@
+"""
+Core and http backends (XCloudScraper, XAsyncScraper, XProcessPipeline), importing it never loads the browser stack
+
+    from fluent_scrape.http import *
+"""
+from . import __entry_point__, __http_modules__
+
+__entry_point__(globals(), *__http_modules__)
@@ -0,0 +1,197 @@
+import bisect
+import collections
+import json
+import threading
+from typing import Any
+
+verbose: bool = True
+
+seconds_buckets: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+bytes_buckets: tuple[float, ...] = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def xverbose(enabled: bool):
+    """
+    Enable or silence the [INFO], missing element, repeated url and timing prints,
+    at high page rates stdout becomes a bottleneck
+    """
+    global verbose
+    verbose = enabled
+
+
+def xinfo(message: str):
+    if verbose:
+        print(message)
+
+
+class XHistogram(object):
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count > 0 else None,
+            "buckets": {str(le): c for le, c in zip(self.buckets + ("+Inf",), self.counts)}
+        }
+
+
+def __escape_label__(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def __format_labels__(labels: tuple[tuple[str, str], ...], extra: str | None = None) -> str:
+    parts = [f'{k}="{__escape_label__(v)}"' for k, v in labels]
+    if extra is not None:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class XMetrics(object):
+    """
+    Thread safe histograms and counters labelled by group (and scrape function, converter type),
+    plus a bounded per-url record of the last max_pages pages. Attach it with XScraper.instrument,
+    scrapers without metrics skip every measurement.
+    """
+
+    def __init__(self, max_pages: int = 10000, prefix: str = "fluent_scrape"):
+        self.max_pages: int = max_pages
+        self.prefix: str = prefix
+        self.histograms: dict[tuple[str, tuple[tuple[str, str], ...]], XHistogram] = {}
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.pages: collections.OrderedDict[tuple[str, str], dict[str, Any]] = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = XHistogram(
+                    bytes_buckets if name.endswith("_bytes") else seconds_buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def __page__(self, id_group: str | None, url: str | None) -> dict[str, Any]:
+        """
+        Per-url record, to be called with the lock held
+        """
+        key = (id_group or "", url or "")
+        page = self.pages.get(key)
+        if page is None:
+            page = self.pages[key] = {"group": key[0], "url": key[1], "scrape_fn_seconds": {}}
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return page
+
+    def record_fetch(self, id_group: str | None, url: str, seconds: float, size: int | None = None):
+        self.observe("fetch_seconds", seconds, group=id_group or "")
+        if size is not None:
+            self.observe("response_bytes", size, group=id_group or "")
+        with self.lock:
+            page = self.__page__(id_group, url)
+            page["fetch_seconds"] = seconds
+            page["bytes"] = size
+
+    def record_parse(self, id_group: str | None, url: str, seconds: float):
+        self.observe("parse_seconds", seconds, group=id_group or "")
+        with self.lock:
+            self.__page__(id_group, url)["parse_seconds"] = seconds
+
+    def record_scrape(self, id_group: str, url: str | None, fn_name: str, seconds: float):
+        self.observe("scrape_fn_seconds", seconds, group=id_group, fn=fn_name)
+        with self.lock:
+            self.__page__(id_group, url)["scrape_fn_seconds"][fn_name] = seconds
+
+    def record_xpath_queries(self, id_group: str, url: str | None, queries: int):
+        self.increment("xpath_queries", queries, group=id_group)
+        self.increment("pages", 1, group=id_group)
+        with self.lock:
+            self.__page__(id_group, url)["xpath_queries"] = queries
+
+    def record_converter_failure(self, type_name: str, value: Any, error: BaseException, id_group: str | None = None,
+                                 url: str | None = None):
+        self.increment("converter_failures", 1, group=id_group or "", type=type_name)
+        if url is not None:
+            with self.lock:
+                page = self.__page__(id_group, url)
+                page["converter_failures"] = page.get("converter_failures", 0) + 1
+
+    def record_merge(self, seconds: float):
+        self.observe("merge_seconds", seconds)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "histograms": [{"name": name, "labels": dict(labels), **h.to_dict()}
+                               for (name, labels), h in self.histograms.items()],
+                "counters": [{"name": name, "labels": dict(labels), "value": v}
+                             for (name, labels), v in self.counters.items()],
+                "pages": [dict(page, scrape_fn_seconds=dict(page["scrape_fn_seconds"]))
+                          for page in self.pages.values()]
+            }
+
+    def to_json(self, path: str | None = None) -> str:
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, path: str | None = None) -> str:
+        """
+        Histograms and counters in the Prometheus text exposition format, per-url records are left out
+        """
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), h in sorted(self.histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for le, c in zip(h.buckets + ("+Inf",), h.counts):
+                    cumulative += c
+                    le_label = f'le="{le}"'
+                    lines.append(f"{metric}_bucket{__format_labels__(labels, le_label)} {cumulative}")
+                lines.append(f"{metric}_sum{__format_labels__(labels)} {h.sum}")
+                lines.append(f"{metric}_count{__format_labels__(labels)} {h.count}")
+
+            for (name, labels), v in sorted(self.counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{__format_labels__(labels)} {v}")
+
+        text = "\n".join(lines) + "\n"
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.pages.clear()
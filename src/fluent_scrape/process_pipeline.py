@@ -0,0 +1,183 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable
+
+from lxml import html
+
+from . import XScraperGroup, XCloudScraper, XCachedResponse, XResultAccumulator, xinfo
+
+scrape_fn_type = Callable[[XScraperGroup], Any | None]
+scrape_registry: dict[str, scrape_fn_type] = {}
+
+
+def xscrape_fn(name: str | None = None):
+    """
+    Register a scrape function by name so worker processes can resolve it without pickling it
+    """
+    def register(fn: scrape_fn_type) -> scrape_fn_type:
+        scrape_registry[name or f"{fn.__module__}.{fn.__qualname__}"] = fn
+        return fn
+
+    return register
+
+
+class XGroupSpec(object):
+    """
+    Picklable definition of a group: its id, headers and scrape functions as registered names or functions
+    """
+
+    def __init__(self, group: XScraperGroup):
+        registered = {id(fn): name for name, fn in scrape_registry.items()}
+        self.id_group: str = group.id_group
+        self.headers: dict[str, str] = group.headers
+        self.scrape_fns: list[str | scrape_fn_type] = []
+        for fn in group.scrape_fns:
+            if id(fn) in registered:
+                self.scrape_fns.append(registered[id(fn)])
+                continue
+            try:
+                pickle.dumps(fn)
+            except Exception:
+                raise Exception(f"Scrape function {fn} of group {group.id_group} is not picklable, "
+                                f"define it at module level or register it with xscrape_fn")
+            self.scrape_fns.append(fn)
+
+    def resolve(self) -> list[scrape_fn_type]:
+        return [scrape_registry[fn] if isinstance(fn, str) else fn for fn in self.scrape_fns]
+
+
+class XDocumentScraper(XCloudScraper):
+    """
+    Scraper running scrape functions on documents handed over as bytes, it never touches the network
+    """
+
+    def __initialize_impl__(self):
+        pass
+
+    def __fetch_response__(self, url: str, x_group: XScraperGroup = None) -> Any:
+        raise Exception("XDocumentScraper cannot fetch, documents are loaded with load_bytes")
+
+    def load_bytes(self, url: str, status_code: int, headers: dict[str, str], content: bytes) -> 'XDocumentScraper':
+        self.response = XCachedResponse(url, status_code, headers, content)
+        self.tree = html.fromstring(content)
+        return self
+
+
+class XEnqueueRecorder(object):
+    """
+    Stands in for a frontier in worker processes, enqueued urls are sent back to the parent
+    """
+
+    def __init__(self, enqueued: list[tuple[str, int, str | None]]):
+        self.enqueued = enqueued
+
+    def submit(self, id_group: str, url: str, priority: int = 0) -> bool:
+        self.enqueued.append((url, priority, id_group))
+        return True
+
+
+__worker_scraper__: XDocumentScraper | None = None
+
+
+def __process_page__(spec: XGroupSpec, url: str, status_code: int, headers: dict[str, str],
+                     content: bytes) -> tuple[list[Any], list[tuple[str, int, str | None]]]:
+    """
+    Parse a page and run the group's scrape functions in a worker process,
+    returns the outputs and the urls enqueued by the scrape functions
+    """
+    global __worker_scraper__
+    if __worker_scraper__ is None:
+        __worker_scraper__ = XDocumentScraper()
+
+    enqueued: list[tuple[str, int, str | None]] = []
+    group = XScraperGroup(__worker_scraper__, spec.id_group, url, spec.headers)
+    group.scrape_fns = spec.resolve()
+    group.frontier = XEnqueueRecorder(enqueued)
+    group.current_url = url
+    __worker_scraper__.load_bytes(url, status_code, headers, content)
+    return list(group.__iter_blocks__()), enqueued
+
+
+def __warm__() -> int:
+    return os.getpid()
+
+
+class XProcessPipeline(object):
+    """
+    Fetches with threads through a template XCloudScraper and parses and runs scrape functions in a process pool,
+    so lxml parsing and extraction scale across cores. Only raw bytes and plain results cross processes,
+    scrape functions must be registered with xscrape_fn or be picklable module-level functions.
+    Url callables are called in the parent ahead of processing.
+    """
+
+    def __init__(self, processes: int | None = None, fetch_threads: int = 8, max_pending: int | None = None,
+                 mp_context: Any = None):
+        self.processes: int = processes or os.cpu_count() or 1
+        self.fetch_threads: int = fetch_threads
+        self.max_pending: int = max_pending or (self.processes + fetch_threads) * 2
+        self.mp_context: Any = mp_context or multiprocessing.get_context()
+
+    def run(self, template: XCloudScraper) -> dict[str, Any]:
+        """
+        Process every group of template and return the merged result
+        """
+        specs = {g.id_group: XGroupSpec(g) for g in template.groups}
+        groups = {g.id_group: g for g in template.groups}
+        seed_urls = {g.id_group: g.__iter_seed_urls__() for g in template.groups}
+        accumulator = XResultAccumulator()
+        pending: dict[Future, tuple[str, XScraperGroup, str]] = {}
+
+        def next_url() -> tuple[XScraperGroup, str] | None:
+            for group in template.groups:
+                urls = seed_urls.get(group.id_group)
+                if urls is not None:
+                    url = next(urls, None)
+                    if url is not None:
+                        return group, url
+                    del seed_urls[group.id_group]
+                if group.pending:
+                    return group, group.pending.popleft()
+            return None
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(self.processes, mp_context=self.mp_context) as process_pool:
+            # start the workers before any fetch thread exists, forking a threaded process is unsafe
+            for f in [process_pool.submit(__warm__) for _ in range(self.processes)]:
+                f.result()
+
+            with ThreadPoolExecutor(self.fetch_threads) as fetch_pool:
+                def fill():
+                    while len(pending) < self.max_pending:
+                        task = next_url()
+                        if task is None:
+                            return
+                        group, url = task
+                        pending[fetch_pool.submit(template.__fetch_response__, url, group)] = ("fetch", group, url)
+
+                fill()
+                while pending:
+                    done, _ = wait(list(pending.keys()), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage, group, url = pending.pop(future)
+                        if stage == "fetch":
+                            r = future.result()
+                            xinfo("[INFO] Extracting data from url: " + url + " | thread_id: " + str(threading.get_ident()))
+                            process_future = process_pool.submit(__process_page__, specs[group.id_group], url,
+                                                                 r.status_code, dict(r.headers), r.content)
+                            pending[process_future] = ("process", group, url)
+                            continue
+
+                        results, enqueued = future.result()
+                        for res in results:
+                            accumulator.add(res)
+                        for enqueued_url, priority, id_group in enqueued:
+                            groups[id_group].enqueue(enqueued_url, priority)
+                    fill()
+
+        end = time.perf_counter()
+        xinfo(f"process pipeline execution and merge took {end - start:0.4f} seconds")
+        return accumulator.result
@@ -0,0 +1,138 @@
+import glob
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+from . import XScraper, XScraperGroup, XResultAccumulator, XJsonLinesSink, XTask, XTaskQueue, xinfo
+
+
+class XQueueFrontier(object):
+    """
+    Stands in for a frontier in queue workers, urls enqueued by scrape functions go to the shared queue
+    """
+
+    def __init__(self, task_queue: XTaskQueue):
+        self.task_queue: XTaskQueue = task_queue
+
+    def submit(self, id_group: str, url: str, priority: int = 0) -> bool:
+        return self.task_queue.put(id_group, url, priority)
+
+
+class XQueueWorker(object):
+    """
+    Runs the groups of a scraper definition on tasks leased from a shared queue, any number of workers on any
+    number of hosts can run the same definition. The outputs of every task are written as one line of
+    output_dir/shard-<worker_id>.jsonl before the task is acked, xmerge_shards merges the shards at the end.
+    A failed task is nacked with exponential backoff and retried until the queue's max_attempts.
+    """
+
+    def __init__(self, task_queue: XTaskQueue, output_dir: str, scraper_maker: Callable[[], XScraper] | None = None,
+                 threads: int = 1, worker_id: str | None = None, visibility_timeout: float = 300,
+                 poll_interval: float = 0.5, retry_delay: float = 1):
+        self.task_queue: XTaskQueue = task_queue
+        self.output_dir: str = output_dir
+        self.scraper_maker: Callable[[], XScraper] | None = scraper_maker
+        self.threads: int = threads if scraper_maker is not None else 1
+        self.worker_id: str = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.visibility_timeout: float = visibility_timeout
+        self.poll_interval: float = poll_interval
+        self.retry_delay: float = retry_delay
+        self.template_groups: dict[str, XScraperGroup] = {}
+        self.frontier = XQueueFrontier(task_queue)
+        self.processed: int = 0
+        self.lock = threading.Lock()
+
+    def __process__(self, scraper: XScraper, groups: dict[str, XScraperGroup], task: XTask) -> list[Any]:
+        group = groups.get(task.id_group)
+        if group is None:
+            template_group = self.template_groups.get(task.id_group)
+            if template_group is None:
+                raise Exception(f"Unknown group: {task.id_group}")
+            group = groups[task.id_group] = template_group.bind(scraper, self.frontier)
+
+        scraper.__prepare_document__(task.url, group)
+        group.current_url = task.url
+        xinfo("[INFO] Extracting data from url: " + task.url + " | thread_id: " + str(threading.get_ident()))
+        return list(group.__iter_blocks__())
+
+    def __work__(self, scraper: XScraper, sink: XJsonLinesSink):
+        groups: dict[str, XScraperGroup] = {}
+        try:
+            while True:
+                task = self.task_queue.lease(self.visibility_timeout)
+                if task is None:
+                    if self.task_queue.unfinished() == 0:
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+
+                try:
+                    outputs = self.__process__(scraper, groups, task)
+                except Exception as e:
+                    print(f"[WARNING] Task failed, attempt {task.attempts}: {task.url} | {e}")
+                    self.task_queue.nack(task, self.retry_delay * 2 ** (task.attempts - 1))
+                    # leased resources such as a crashed browser are returned, the next task acquires them again
+                    scraper.__finish__(e)
+                    continue
+
+                sink.write({"id_group": task.id_group, "url": task.url, "outputs": outputs})
+                sink.flush()
+                self.task_queue.ack(task)
+                with self.lock:
+                    self.processed += 1
+        finally:
+            scraper.__finish__()
+
+    def run(self, template: XScraper, seed: bool = True) -> int:
+        """
+        Process tasks until the queue is drained, seeding it with the urls of template's groups first.
+        Returns the number of tasks this worker processed
+        """
+        self.template_groups = {g.id_group: g for g in template.groups}
+        if seed:
+            self.task_queue.seed(template)
+
+        scrapers = [self.scraper_maker() for _ in range(self.threads)] if self.scraper_maker is not None \
+            else [template]
+        for scraper in scrapers:
+            if scraper is not template:
+                scraper.headers = {**template.headers, **scraper.headers}
+                if template.metrics is not None and scraper.metrics is None:
+                    scraper.instrument(template.metrics)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        start = time.perf_counter()
+        with XJsonLinesSink(os.path.join(self.output_dir, f"shard-{self.worker_id}.jsonl")) as sink:
+            threads = [threading.Thread(target=self.__work__, args=(scraper, sink)) for scraper in scrapers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        xinfo(f"worker {self.worker_id} processed {self.processed} tasks in {time.perf_counter() - start:0.4f} seconds")
+        return self.processed
+
+
+def xmerge_shards(output_dir: str) -> dict[str, Any]:
+    """
+    Merge the shards written by queue workers. A task delivered more than once is counted once,
+    outputs went through JSON so values such as datetimes come back as strings
+    """
+    accumulator = XResultAccumulator()
+    merged: set[tuple[str, str]] = set()
+    for path in sorted(glob.glob(os.path.join(output_dir, "shard-*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # torn write of a worker that died, the task was not acked and ran again
+                    continue
+                record = json.loads(line)
+                key = (record["id_group"], record["url"])
+                if key in merged:
+                    continue
+                merged.add(key)
+                for output in record["outputs"]:
+                    accumulator.merge(output)
+    return accumulator.result
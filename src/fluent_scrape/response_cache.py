@@ -0,0 +1,319 @@
+import abc
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+def __header_value__(headers: Any, name: str) -> str | None:
+    lower_name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lower_name:
+            return value
+    return None
+
+
+class XCachedResponse(object):
+    """
+    Response stored by the cache, exposes the same fields scrapers read from a requests response.
+    vary holds the values of the request headers named by the Vary header when the response was fetched
+    """
+
+    def __init__(self, url: str, status_code: int, headers: dict[str, str], content: bytes,
+                 stored_at: float | None = None, expires_at: float = 0, vary: dict[str, str | None] | None = None):
+        self.url: str = url
+        self.status_code: int = status_code
+        self.headers: dict[str, str] = headers
+        self.content: bytes = content
+        self.stored_at: float = stored_at if stored_at is not None else time.time()
+        self.expires_at: float = expires_at
+        self.vary: dict[str, str | None] | None = vary
+
+    @staticmethod
+    def from_response(r: Any, request_headers: dict[str, str] | None = None) -> 'XCachedResponse':
+        response = XCachedResponse(r.url, r.status_code, dict(r.headers), r.content)
+        vary = response.__header__("Vary")
+        if vary:
+            # the headers actually sent, session defaults and cookies included, when the response keeps them
+            sent = getattr(getattr(r, "request", None), "headers", None) or request_headers or {}
+            response.vary = {name.strip().lower(): __header_value__(sent, name.strip())
+                             for name in vary.split(",") if name.strip()}
+        return response
+
+    @property
+    def etag(self) -> str | None:
+        return self.__header__("ETag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.__header__("Last-Modified")
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def matches(self, request_headers: dict[str, str]) -> bool:
+        """
+        Whether the response can answer a request with request_headers according to its Vary header
+        """
+        if not self.vary:
+            return True
+        if "*" in self.vary:
+            return False
+        return all(__header_value__(request_headers, name) == value for name, value in self.vary.items())
+
+    def __header__(self, name: str) -> str | None:
+        return __header_value__(self.headers, name)
+
+
+class XCacheStore(metaclass=abc.ABCMeta):
+    """
+    Abstract class for all cache stores
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> XCachedResponse | None:
+        pass
+
+    @abc.abstractmethod
+    def set(self, key: str, entry: XCachedResponse):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        pass
+
+
+class XMemoryCacheStore(XCacheStore):
+    """
+    In-memory LRU store bounded by entry count and total body size
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict[str, XCachedResponse] = OrderedDict()
+        self.total_bytes: int = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> XCachedResponse | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: XCachedResponse):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            self.entries[key] = entry
+            self.total_bytes += entry.size
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+
+    def delete(self, key: str):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+
+
+class XSqliteCacheStore(XCacheStore):
+    """
+    On-disk store backed by SQLite, least recently used entries are evicted above max_bytes
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status_code INTEGER, headers TEXT, content BLOB, "
+            "stored_at REAL, expires_at REAL, size INTEGER, accessed_at REAL, vary TEXT)"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(responses)")]
+        if "vary" not in columns:
+            self.connection.execute("ALTER TABLE responses ADD COLUMN vary TEXT")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.connection.commit()
+
+    def get(self, key: str) -> XCachedResponse | None:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT url, status_code, headers, content, stored_at, expires_at, vary FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+
+        url, status_code, headers, content, stored_at, expires_at, vary = row
+        return XCachedResponse(url, status_code, json.loads(headers), content, stored_at, expires_at,
+                               json.loads(vary) if vary else None)
+
+    def set(self, key: str, entry: XCachedResponse):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.url, entry.status_code, json.dumps(entry.headers), entry.content,
+                 entry.stored_at, entry.expires_at, entry.size, time.time(),
+                 json.dumps(entry.vary) if entry.vary else None)
+            )
+            self.__evict__()
+            self.connection.commit()
+
+    def delete(self, key: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.connection.commit()
+
+    def __evict__(self):
+        total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        rows = self.connection.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total_bytes <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total_bytes -= size
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+fetch_fn_type = Callable[[str, dict[str, str]], Any]
+
+
+class XResponseCache(object):
+    """
+    Response cache layering a memory store in front of an optional disk store.
+    Entries are keyed by url and request headers and honor the Vary header of the response.
+    Stale entries are revalidated with If-None-Match/If-Modified-Since, concurrent requests
+    for the same url and headers share a single fetch.
+    """
+
+    def __init__(self, ttl: float = 3600, memory: XCacheStore | None = None, disk: XCacheStore | None = None,
+                 cacheable_status: tuple[int, ...] = (200,)):
+        self.ttl: float = ttl
+        self.stores: list[XCacheStore] = [s for s in (memory if memory is not None else XMemoryCacheStore(), disk)
+                                          if s is not None]
+        self.cacheable_status: tuple[int, ...] = cacheable_status
+        self.in_flight: dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.revalidated: int = 0
+        self.shared: int = 0
+
+    @staticmethod
+    def key(url: str, headers: dict[str, str]) -> str:
+        if not headers:
+            return url
+        canonical = json.dumps(sorted((k.lower(), v) for k, v in headers.items()))
+        return url + " " + hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+    def __count__(self, counter: str):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def fetch(self, url: str, headers: dict[str, str], fetch_fn: fetch_fn_type,
+              session_headers: dict[str, str] | None = None) -> XCachedResponse:
+        """
+        Get the response of url from the cache or by calling fetch_fn(url, headers).
+        session_headers are the headers the session adds to every request, compared against the Vary header
+        """
+        key = XResponseCache.key(url, headers)
+        request_headers = {**session_headers, **headers} if session_headers else headers
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+
+        if not leader:
+            response = future.result()
+            if response.matches(request_headers):
+                self.__count__("shared")
+                return response
+            return self.__fetch_leader__(key, url, headers, request_headers, fetch_fn)
+
+        try:
+            response = self.__fetch_leader__(key, url, headers, request_headers, fetch_fn)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def __lookup__(self, key: str) -> XCachedResponse | None:
+        for i, store in enumerate(self.stores):
+            entry = store.get(key)
+            if entry is not None:
+                for upper_store in self.stores[:i]:
+                    upper_store.set(key, entry)
+                return entry
+        return None
+
+    def __store__(self, key: str, entry: XCachedResponse):
+        for store in self.stores:
+            store.set(key, entry)
+
+    def __fetch_leader__(self, key: str, url: str, headers: dict[str, str], request_headers: dict[str, str],
+                         fetch_fn: fetch_fn_type) -> XCachedResponse:
+        cached = self.__lookup__(key)
+        if cached is not None and not cached.matches(request_headers):
+            cached = None
+        if cached is not None and cached.is_fresh():
+            self.__count__("hits")
+            return cached
+
+        conditional_headers = dict(headers)
+        if cached is not None:
+            if cached.etag:
+                conditional_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                conditional_headers["If-Modified-Since"] = cached.last_modified
+
+        response = XCachedResponse.from_response(fetch_fn(url, conditional_headers), request_headers)
+        if cached is not None and response.status_code == 304:
+            self.__count__("revalidated")
+            cached.headers = {**cached.headers, **response.headers}
+            cached.expires_at = time.time() + self.ttl
+            self.__store__(key, cached)
+            return cached
+
+        self.__count__("misses")
+        cache_control = (response.__header__("Cache-Control") or "").lower()
+        if response.status_code in self.cacheable_status and "no-store" not in cache_control \
+                and not (response.vary and "*" in response.vary):
+            response.expires_at = time.time() + self.ttl
+            self.__store__(key, response)
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "shared": self.shared
+            }
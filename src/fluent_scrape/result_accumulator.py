@@ -0,0 +1,57 @@
+from typing import Any
+
+
+def __own__(value: Any) -> Any:
+    """
+    Copy the containers of value so they can be extended in place without touching the caller's objects
+    """
+    if isinstance(value, dict):
+        return {k: __own__(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def __merge_into__(base: dict, nxt: dict):
+    for k, v in nxt.items():
+        if k not in base:
+            base[k] = __own__(v)
+            continue
+
+        curr = base[k]
+        if isinstance(curr, list) and isinstance(v, list):
+            curr.extend(v)
+        elif isinstance(curr, dict) and isinstance(v, dict):
+            __merge_into__(curr, v)
+        elif isinstance(curr, set) and isinstance(v, set):
+            curr |= v
+        else:
+            base[k] = __own__(v)
+
+
+class XResultAccumulator(object):
+    """
+    Accumulates scrape results in place with the output shape of deepmerge's always_merger:
+    dicts are merged, lists appended, sets united and anything else overridden.
+    Only the incoming value is walked, so appending a record costs O(1) amortized however big the result is.
+    Incoming containers are copied when first adopted, merged values are never modified.
+    """
+
+    def __init__(self, result: dict[str, Any] | None = None):
+        self.result: dict[str, Any] = result if result is not None else {}
+
+    def add(self, value: dict[str, Any]) -> 'XResultAccumulator':
+        """
+        Merge the output of a scrape function, value is copied so the caller can keep using it
+        """
+        __merge_into__(self.result, value)
+        return self
+
+    def merge(self, partition: dict[str, Any]) -> 'XResultAccumulator':
+        """
+        Concatenate a finished partition such as another scraper's result, the partition is left untouched
+        """
+        __merge_into__(self.result, partition)
+        return self
@@ -0,0 +1,79 @@
+import threading
+from typing import Any
+
+import cloudscraper
+from requests.adapters import HTTPAdapter
+
+
+class XSessionPool(object):
+    """
+    Pool of cloudscraper sessions sharing connections, cookies and user agent.
+    Every session mounts the same transport adapters, so keep-alive connections and the per-host
+    limit are shared by all workers, and a challenge solved by one worker is reused by the others.
+    """
+
+    def __init__(self, max_connections_per_host: int = 10, max_hosts: int = 32, block: bool = True,
+                 **scraper_kwargs):
+        self.max_connections_per_host: int = max_connections_per_host
+        self.max_hosts: int = max_hosts
+        self.block: bool = block
+        self.scraper_kwargs: dict[str, Any] = scraper_kwargs
+        self.sessions: list[cloudscraper.CloudScraper] = []
+        self.lock = threading.Lock()
+
+        self.template = cloudscraper.create_scraper(**scraper_kwargs)
+        self.https_adapter: HTTPAdapter = self.template.adapters['https://']
+        self.http_adapter: HTTPAdapter = HTTPAdapter()
+        for adapter in (self.https_adapter, self.http_adapter):
+            adapter._pool_connections = max_hosts
+            adapter._pool_maxsize = max_connections_per_host
+            adapter._pool_block = block
+            adapter.init_poolmanager(max_hosts, max_connections_per_host, block=block)
+
+    def create_session(self) -> cloudscraper.CloudScraper:
+        """
+        Create a session bound to the shared adapters, cookie jar and headers
+        """
+        with self.lock:
+            session = cloudscraper.create_scraper(sess=self.template, cipherSuite=self.template.cipherSuite,
+                                                  **self.scraper_kwargs)
+            session.headers = self.template.headers.copy()
+            session.mount('https://', self.https_adapter)
+            session.mount('http://', self.http_adapter)
+            self.sessions.append(session)
+            return session
+
+    @property
+    def cookies(self):
+        return self.template.cookies
+
+    @property
+    def user_agent(self) -> str:
+        return self.template.headers['User-Agent']
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Connection reuse statistics of the shared adapters
+        """
+        requests = 0
+        connections = 0
+        for adapter in (self.https_adapter, self.http_adapter):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests += pool.num_requests
+                connections += pool.num_connections
+
+        return {
+            "sessions": len(self.sessions),
+            "requests": requests,
+            "connections": connections,
+            "reused": max(requests - connections, 0),
+            "reuse_rate": (max(requests - connections, 0) / requests) if requests > 0 else 0.0
+        }
+
+    def close(self):
+        self.https_adapter.close()
+        self.http_adapter.close()
@@ -0,0 +1,158 @@
+import abc
+import csv
+import json
+import queue
+import threading
+from typing import Any, Callable, Iterable
+
+
+class XResultSink(metaclass=abc.ABCMeta):
+    """
+    Abstract class for all sinks receiving streamed records
+    """
+
+    @abc.abstractmethod
+    def write(self, record: dict[str, Any]):
+        pass
+
+    def flush(self):
+        """
+        Wait until the records written so far are handed over, e.g. before acknowledging them
+        """
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def __rows__(record: dict[str, Any], key: str | None) -> list[Any]:
+    """
+    Rows of a record, the items of record[key] when key is given or the record itself
+    """
+    if key is None:
+        return [record]
+
+    value = record.get(key)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class XJsonLinesSink(XResultSink):
+    """
+    Write one JSON document per line, the items of record[key] when key is given
+    """
+
+    def __init__(self, path: str, key: str | None = None, mode: str = "a"):
+        self.key: str | None = key
+        self.file = open(path, mode, encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]):
+        lines = [json.dumps(row, default=str) + "\n" for row in __rows__(record, self.key)]
+        with self.lock:
+            self.file.writelines(lines)
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class XCsvSink(XResultSink):
+    """
+    Write the items of record[key] (or the records themselves) as CSV rows, nested values are JSON encoded.
+    Columns are taken from the first row unless fieldnames is given.
+    """
+
+    def __init__(self, path: str, key: str | None = None, fieldnames: list[str] | None = None):
+        self.key: str | None = key
+        self.fieldnames: list[str] | None = fieldnames
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer: csv.DictWriter | None = None
+        self.lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]):
+        rows = [{k: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v for k, v in row.items()}
+                for row in __rows__(record, self.key)]
+        with self.lock:
+            for row in rows:
+                if self.writer is None:
+                    self.writer = csv.DictWriter(self.file, self.fieldnames or list(row.keys()),
+                                                 extrasaction="ignore")
+                    self.writer.writeheader()
+                self.writer.writerow(row)
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class XCallbackSink(XResultSink):
+    """
+    Hand records to callback on a background thread, write blocks once max_pending records are waiting
+    """
+
+    def __init__(self, callback: Callable[[dict[str, Any]], Any], max_pending: int = 100):
+        self.callback: Callable[[dict[str, Any]], Any] = callback
+        self.pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.error: BaseException | None = None
+        self.done = object()
+        self.thread = threading.Thread(target=self.__consume__, daemon=True)
+        self.thread.start()
+
+    def __consume__(self):
+        while True:
+            record = self.pending.get()
+            if record is self.done:
+                return
+            try:
+                if self.error is None:
+                    self.callback(record)
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.pending.task_done()
+
+    def write(self, record: dict[str, Any]):
+        if self.error is not None:
+            raise self.error
+        self.pending.put(record)
+
+    def flush(self):
+        self.pending.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.pending.put(self.done)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def xstream_to(records: Iterable[dict[str, Any]], *sinks: XResultSink) -> int:
+    """
+    Write every record to every sink and close them, returns the number of records written
+    """
+    count = 0
+    try:
+        for record in records:
+            for sink in sinks:
+                sink.write(record)
+            count += 1
+    finally:
+        for sink in sinks:
+            sink.close()
+    return count
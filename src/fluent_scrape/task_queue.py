@@ -0,0 +1,295 @@
+import abc
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+
+class XTask(object):
+    def __init__(self, id_group: str, url: str, priority: int = 0, attempts: int = 0, token: str | None = None):
+        self.id_group: str = id_group
+        self.url: str = url
+        self.priority: int = priority
+        self.attempts: int = attempts
+        # identifies the lease, an ack or nack with an expired token is ignored
+        self.token: str | None = token
+
+
+class XTaskQueue(metaclass=abc.ABCMeta):
+    """
+    Abstract class for shared task queues with at-least-once delivery. A leased task is invisible to other workers
+    until it is acked, nacked or its visibility timeout expires, then it is delivered again.
+    Tasks are deduplicated by group and url within the job, a task leased more than max_attempts times is failed.
+    """
+
+    @abc.abstractmethod
+    def put(self, id_group: str, url: str, priority: int = 0) -> bool:
+        """
+        Queue url for the group id_group, returns False when the job already saw it
+        """
+        pass
+
+    @abc.abstractmethod
+    def lease(self, visibility_timeout: float = 60) -> XTask | None:
+        """
+        Take the task with the highest priority, None when no task is available right now
+        """
+        pass
+
+    @abc.abstractmethod
+    def ack(self, task: XTask) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def nack(self, task: XTask, delay: float = 0) -> bool:
+        """
+        Give the task back, it is delivered again after delay seconds
+        """
+        pass
+
+    @abc.abstractmethod
+    def unfinished(self) -> int:
+        """
+        Number of tasks queued or leased, the job is done when it reaches 0
+        """
+        pass
+
+    @abc.abstractmethod
+    def failed(self) -> list[tuple[str, str]]:
+        pass
+
+    def seed(self, template: Any) -> int:
+        """
+        Queue the urls every group of template was declared with, safe to call from every worker
+        """
+        queued = 0
+        for group in template.groups:
+            for url in group.__iter_seed_urls__():
+                queued += self.put(group.id_group, url)
+        return queued
+
+    def close(self):
+        pass
+
+
+class XSqliteTaskQueue(XTaskQueue):
+    """
+    Task queue in a SQLite file, shared by the processes of a single host
+    """
+
+    def __init__(self, path: str, job: str = "default", max_attempts: int = 5):
+        self.path: str = path
+        self.job: str = job
+        self.max_attempts: int = max_attempts
+        self.lock = threading.Lock()
+        # autocommit, leases take the write lock explicitly with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "job TEXT, id_group TEXT, url TEXT, priority INTEGER, seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "state TEXT, attempts INTEGER, visible_at REAL, token TEXT, UNIQUE (job, id_group, url))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (job, state, priority, seq)")
+
+    def put(self, id_group: str, url: str, priority: int = 0) -> bool:
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO tasks (job, id_group, url, priority, state, attempts, visible_at) "
+                "VALUES (?, ?, ?, ?, 'queued', 0, 0)", (self.job, id_group, url, priority)
+            )
+            return cursor.rowcount > 0
+
+    def lease(self, visibility_timeout: float = 60) -> XTask | None:
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self.connection.execute(
+                    "UPDATE tasks SET state = 'failed', token = NULL "
+                    "WHERE job = ? AND state = 'leased' AND visible_at <= ? AND attempts >= ?",
+                    (self.job, now, self.max_attempts)
+                )
+                row = self.connection.execute(
+                    "SELECT seq, id_group, url, priority, attempts FROM tasks "
+                    "WHERE job = ? AND (state = 'queued' OR (state = 'leased' AND visible_at <= ?)) "
+                    "ORDER BY priority DESC, seq LIMIT 1", (self.job, now)
+                ).fetchone()
+                if row is None:
+                    self.connection.execute("COMMIT")
+                    return None
+
+                seq, id_group, url, priority, attempts = row
+                token = uuid.uuid4().hex
+                self.connection.execute(
+                    "UPDATE tasks SET state = 'leased', attempts = ?, visible_at = ?, token = ? WHERE seq = ?",
+                    (attempts + 1, now + visibility_timeout, token, seq)
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        return XTask(id_group, url, priority, attempts + 1, token)
+
+    def ack(self, task: XTask) -> bool:
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE tasks SET state = 'done', token = NULL WHERE job = ? AND id_group = ? AND url = ? AND token = ?",
+                (self.job, task.id_group, task.url, task.token)
+            )
+            return cursor.rowcount > 0
+
+    def nack(self, task: XTask, delay: float = 0) -> bool:
+        with self.lock:
+            # stays leased with a shorter deadline, it is delivered again once visible_at passes
+            cursor = self.connection.execute(
+                "UPDATE tasks SET visible_at = ?, token = NULL WHERE job = ? AND id_group = ? AND url = ? AND token = ?",
+                (time.time() + delay, self.job, task.id_group, task.url, task.token)
+            )
+            return cursor.rowcount > 0
+
+    def unfinished(self) -> int:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job = ? AND state IN ('queued', 'leased') "
+                "AND NOT (state = 'leased' AND visible_at <= ? AND attempts >= ?)",
+                (self.job, time.time(), self.max_attempts)
+            ).fetchone()[0]
+
+    def failed(self) -> list[tuple[str, str]]:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT id_group, url FROM tasks WHERE job = ? AND state = 'failed' ORDER BY seq", (self.job,)
+            ).fetchall()
+
+    def reset(self):
+        """
+        Forget every task of the job
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM tasks WHERE job = ?", (self.job,))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# KEYS: seen, seq, scores, queued  ARGV: seen member, member, priority
+__redis_put_script__ = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+local score = string.format('%.17g', -tonumber(ARGV[3]) * 4294967296 + redis.call('INCR', KEYS[2]))
+redis.call('HSET', KEYS[3], ARGV[2], score)
+redis.call('ZADD', KEYS[4], score, ARGV[2])
+return 1
+"""
+
+# KEYS: queued, leased, attempts, scores, failed, tokens  ARGV: now, deadline, max_attempts, token
+__redis_lease_script__ = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, member in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('HDEL', KEYS[6], member)
+    if tonumber(redis.call('HGET', KEYS[3], member) or '0') >= tonumber(ARGV[3]) then
+        redis.call('SADD', KEYS[5], member)
+    else
+        redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[4], member), member)
+    end
+end
+local popped = redis.call('ZPOPMIN', KEYS[1])
+if #popped == 0 then
+    return nil
+end
+local member = popped[1]
+redis.call('ZADD', KEYS[2], ARGV[2], member)
+redis.call('HSET', KEYS[6], member, ARGV[4])
+return {member, redis.call('HINCRBY', KEYS[3], member, 1)}
+"""
+
+# KEYS: leased, tokens  ARGV: member, token, deadline (empty to remove)
+__redis_release_script__ = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+if ARGV[3] == '' then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+else
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+end
+return 1
+"""
+
+
+class XRedisTaskQueue(XTaskQueue):
+    """
+    Task queue on a Redis compatible server shared by many hosts, requires the redis package.
+    Puts and leases run as server side scripts so a task is never lost or queued twice between two workers
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", job: str = "default", max_attempts: int = 5,
+                 client: Any = None):
+        if client is None:
+            # imported here so that importing the package does not load the redis client
+            try:
+                import redis
+            except ImportError:
+                raise Exception("XRedisTaskQueue requires the redis package")
+            client = redis.Redis.from_url(url)
+        self.client: Any = client
+        self.job: str = job
+        self.max_attempts: int = max_attempts
+        prefix = f"fluent_scrape:{job}"
+        self.keys: dict[str, str] = {name: f"{prefix}:{name}" for name in
+                                     ("seen", "seq", "queued", "leased", "attempts", "scores", "failed", "tokens")}
+        self.put_script = self.client.register_script(__redis_put_script__)
+        self.lease_script = self.client.register_script(__redis_lease_script__)
+        self.release_script = self.client.register_script(__redis_release_script__)
+
+    def __lease_keys__(self) -> list[str]:
+        return [self.keys[name] for name in ("queued", "leased", "attempts", "scores", "failed", "tokens")]
+
+    def put(self, id_group: str, url: str, priority: int = 0) -> bool:
+        # lower scores are leased first: by priority, then in insertion order
+        return bool(self.put_script(keys=[self.keys[name] for name in ("seen", "seq", "scores", "queued")],
+                                    args=[json.dumps([id_group, url]), json.dumps([id_group, url, priority]),
+                                          priority]))
+
+    def lease(self, visibility_timeout: float = 60) -> XTask | None:
+        now = time.time()
+        token = uuid.uuid4().hex
+        leased = self.lease_script(keys=self.__lease_keys__(),
+                                   args=[now, now + visibility_timeout, self.max_attempts, token])
+        if leased is None:
+            return None
+        id_group, url, priority = json.loads(leased[0])
+        return XTask(id_group, url, priority, int(leased[1]), token)
+
+    def __release__(self, task: XTask, deadline: float | None) -> bool:
+        member = json.dumps([task.id_group, task.url, task.priority])
+        return bool(self.release_script(keys=[self.keys["leased"], self.keys["tokens"]],
+                                        args=[member, task.token, "" if deadline is None else deadline]))
+
+    def ack(self, task: XTask) -> bool:
+        return self.__release__(task, None)
+
+    def nack(self, task: XTask, delay: float = 0) -> bool:
+        return self.__release__(task, time.time() + delay)
+
+    def unfinished(self) -> int:
+        pipeline = self.client.pipeline()
+        pipeline.zcard(self.keys["queued"])
+        pipeline.zcard(self.keys["leased"])
+        return sum(pipeline.execute())
+
+    def failed(self) -> list[tuple[str, str]]:
+        return [tuple(json.loads(member)[:2]) for member in self.client.smembers(self.keys["failed"])]
+
+    def reset(self):
+        """
+        Forget every task of the job
+        """
+        self.client.delete(*self.keys.values())
@@ -1,5 +1,6 @@
+import locale
 import traceback
-from typing import Any, Protocol
+from typing import Any, Callable, Iterable, Protocol
 from datetime import datetime
 
 
@@ -8,18 +9,134 @@ class XValueConverterCallback(Protocol):
         ...
 
 
+# builds a single argument converter from the converter arguments, called once per compiled spec
+converter_compiler_type = Callable[..., Callable[[Any], Any]]
+
+# called with (type_name, value, error) when an _or_none conversion fails
+failure_hook_type = Callable[[str, Any, BaseException], Any]
+
+# whitespace and apostrophes only ever group digits
+number_blanks = str.maketrans("", "", " \t\n\u00a0\u202f'")
+
+# decimal and thousands separators of numbers that could be read both ways, e.g. "1,234" is 1234 and "1.234" 1.234
+default_separators: tuple[str, str | None] = (".", ",")
+
+iso_formats: dict[str, int] = {
+    "%Y-%m-%d": 10,
+    "%Y-%m-%d %H:%M:%S": 19,
+    "%Y-%m-%dT%H:%M:%S": 19
+}
+
+
+def __numpy__() -> Any:
+    """
+    NumPy when it is installed, imported on first use so that importing the package does not load it
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def __number_format__(*args) -> tuple[str | None, str | None]:
+    """
+    Decimal and thousands separators from the converter arguments: nothing to guess them per value,
+    "locale" for the current locale or the separators themselves, e.g. (",", ".")
+    """
+    if not args:
+        return None, None
+    if args[0] == "locale":
+        conv = locale.localeconv()
+        return conv["decimal_point"], conv["thousands_sep"] or None
+    return args[0], args[1] if len(args) > 1 else None
+
+
+def __guess_separators__(text: str) -> tuple[str, str | None] | None:
+    """
+    Separators a formatted number shows unambiguously, None when it has none or could be read both ways.
+    With two different separators the last one is decimal and a repeated separator groups thousands.
+    A single separator groups thousands only after one to three digits and before exactly three, so "1,234"
+    is ambiguous while "12,5", "0,125" and "1234,567" are decimal
+    """
+    comma, dot = text.rfind(","), text.rfind(".")
+    if comma >= 0 and dot >= 0:
+        return (",", ".") if comma > dot else (".", ",")
+    if comma < 0 and dot < 0:
+        return None
+
+    sep, other = (",", ".") if comma >= 0 else (".", ",")
+    if text.count(sep) > 1:
+        return other, sep
+    index = text.index(sep)
+    head = text[:index].lstrip("+-")
+    if len(text) - index != 4 or not 0 < len(head) <= 3 or head == "0":
+        return sep, other
+    return None
+
+
+def __column_separators__(values: Iterable[Any]) -> tuple[str, str | None] | None:
+    """
+    Separators of the first value of a column that shows them unambiguously, every value of the column
+    is then read the same way. None when no value shows them, ambiguous values use default_separators anyway
+    """
+    for value in values:
+        if isinstance(value, str) and ("," in value or "." in value):
+            separators = __guess_separators__(value.translate(number_blanks))
+            if separators is not None:
+                return separators
+    return None
+
+
+def __normalize_number__(value: Any, decimal: str | None = None, thousands: str | None = None) -> str:
+    """
+    Canonical form of a formatted number, "1.234,5" -> "1234.5".
+    Without separators they are guessed from the value, ambiguous values use default_separators
+    """
+    text = str(value).translate(number_blanks)
+    if decimal is None:
+        decimal, thousands = __guess_separators__(text) or default_separators
+    if thousands:
+        text = text.replace(thousands, "")
+    if decimal != ".":
+        text = text.replace(decimal, ".")
+    return text
+
+
 def __to_string__(value: Any) -> str:
     return str(value)
 
 
-def __to_int__(value: Any) -> int:
-    value = str(value).replace(",", "").replace(".", "")
-    return int(value)
+def __parse_int__(value: Any, decimal: str | None, thousands: str | None) -> int:
+    if isinstance(value, int):
+        return value
+    if decimal is None and isinstance(value, str) and value.isdigit():
+        return int(value)
+
+    # same syntax as the NumPy path of convert_column: int() of the whole part, the fraction can only be zeros
+    whole, _, fraction = __normalize_number__(value, decimal, thousands).partition(".")
+    if fraction.strip("0"):
+        raise ValueError(f"Not an integer: {value}")
+    return int(whole)
+
+
+def __parse_float__(value: Any, decimal: str | None, thousands: str | None) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if decimal is None and isinstance(value, str) and "," not in value and value.count(".") <= 1:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return float(__normalize_number__(value, decimal, thousands))
+
+
+def __to_int__(value: Any, *args) -> int:
+    return __parse_int__(value, *__number_format__(*args))
 
 
-def __to_float__(value: Any) -> float:
-    value = str(value).replace(",", ".")
-    return float(value)
+def __to_float__(value: Any, *args) -> float:
+    return __parse_float__(value, *__number_format__(*args))
 
 
 def __to_bool__(value: Any) -> bool:
@@ -30,6 +147,32 @@ def __to_datetime__(value: Any, *args) -> datetime:
     return datetime.strptime(value, args[0])
 
 
+def __compile_int__(*args) -> Callable[[Any], int]:
+    decimal, thousands = __number_format__(*args)
+    return lambda value: __parse_int__(value, decimal, thousands)
+
+
+def __compile_float__(*args) -> Callable[[Any], float]:
+    decimal, thousands = __number_format__(*args)
+    return lambda value: __parse_float__(value, decimal, thousands)
+
+
+def __compile_datetime__(*args) -> Callable[[Any], datetime]:
+    fmt = args[0]
+    length = iso_formats.get(fmt)
+    if length is None:
+        return lambda value: datetime.strptime(value, fmt)
+
+    def convert(value: Any) -> datetime:
+        # fixed width ISO values skip strptime's regex matching
+        if isinstance(value, str) and len(value) == length and value[4] == "-" and value[7] == "-" \
+                and (length == 10 or (value[10] == fmt[8] and value[13] == ":" and value[16] == ":")):
+            return datetime.fromisoformat(value)
+        return datetime.strptime(value, fmt)
+
+    return convert
+
+
 class XValueConverter(object):
     table: dict[str, XValueConverterCallback] = {
         "str": __to_string__,
@@ -38,26 +181,174 @@ class XValueConverter(object):
         "bool": __to_bool__,
         "datetime": __to_datetime__
     }
+    compilers: dict[str, converter_compiler_type] = {
+        "int": __compile_int__,
+        "float": __compile_float__,
+        "datetime": __compile_datetime__
+    }
+    compiled: dict[tuple, Callable[[Any], Any]] = {}
+    # called when an _or_none conversion fails and the caller passed no failure_hook,
+    # instrumented scrapers pass their own hook attributing failures to the group and url
+    failure_hook: failure_hook_type | None = None
 
     @staticmethod
-    def register_type(name: str, func: XValueConverterCallback):
+    def register_type(name: str, func: XValueConverterCallback, compiler: converter_compiler_type | None = None):
         XValueConverter.table[name] = func
+        if compiler is not None:
+            XValueConverter.compilers[name] = compiler
+        else:
+            XValueConverter.compilers.pop(name, None)
+        XValueConverter.compiled.clear()
+
+    @staticmethod
+    def compile(type_name: str = "str", *vargs) -> Callable[[Any], Any]:
+        """
+        Resolve a type spec such as ("float_or_none", ",", ".") once into a single argument converter
+        """
+        try:
+            key = (type_name, *vargs)
+            return XValueConverter.compiled[key]
+        except TypeError:
+            return XValueConverter.__compile_spec__(type_name, *vargs)
+        except KeyError:
+            converter = XValueConverter.compiled[key] = XValueConverter.__compile_spec__(type_name, *vargs)
+            return converter
 
     @staticmethod
-    def convert(value: str | Any, type_name: str = "str", *vargs) -> Any:
+    def __compile_spec__(type_name: str, *vargs) -> Callable[[Any], Any]:
         debug = type_name.endswith("_or_noneD")
         none_if_exception = debug or type_name.endswith("_or_none")
 
         converter_name = type_name if not none_if_exception else (type_name[:-8] if not debug else type_name[:-9])
-        if converter_name in XValueConverter.table:
-            if not none_if_exception:
-                return XValueConverter.table[converter_name](value, *vargs)
+        if converter_name not in XValueConverter.table:
+            raise Exception(f"Unknown type: {type_name}")
+
+        if converter_name in XValueConverter.compilers:
+            converter = XValueConverter.compilers[converter_name](*vargs)
+        elif vargs:
+            func = XValueConverter.table[converter_name]
+            converter = lambda value: func(value, *vargs)
+        else:
+            converter = XValueConverter.table[converter_name]
 
+        if not none_if_exception:
+            return converter
+
+        def convert_or_none(value: Any, failure_hook: failure_hook_type | None = None) -> Any:
             try:
-                return XValueConverter.table[converter_name](value, *vargs)
-            except:
+                return converter(value)
+            except BaseException as e:
                 if debug:
                     traceback.print_exc()
+                if failure_hook is None:
+                    failure_hook = XValueConverter.failure_hook
+                if failure_hook is not None:
+                    failure_hook(type_name, value, e)
                 return None
-        else:
-            raise Exception(f"Unknown type: {type_name}")
+
+        return convert_or_none
+
+    @staticmethod
+    def __compile_hooked__(type_name: str, *vargs, failure_hook: failure_hook_type | None = None) -> Callable[[Any], Any]:
+        """
+        Like compile, failures of an _or_none spec are reported to failure_hook instead of the process wide hook
+        """
+        converter = XValueConverter.compile(type_name, *vargs)
+        if failure_hook is None or not type_name.endswith(("_or_none", "_or_noneD")):
+            return converter
+        return lambda value: converter(value, failure_hook)
+
+    @staticmethod
+    def convert(value: str | Any, type_name: str = "str", *vargs,
+                failure_hook: failure_hook_type | None = None) -> Any:
+        return XValueConverter.__compile_hooked__(type_name, *vargs, failure_hook=failure_hook)(value)
+
+    @staticmethod
+    def __number_type__(type_name: str) -> str | None:
+        """
+        "int" or "float" when type_name converts with the built-in number converters
+        """
+        base = type_name.split("_or_none")[0]
+        if base in ("int", "float") and XValueConverter.table[base] in (__to_int__, __to_float__):
+            return base
+        return None
+
+    @staticmethod
+    def convert_many(values: Iterable[str | Any], type_name: str = "str", *vargs,
+                     failure_hook: failure_hook_type | None = None) -> list[Any]:
+        """
+        Convert a whole column of values with one compiled converter, repeated dates are parsed once.
+        Without explicit separators a number column is read with the separators of its first unambiguous value
+        """
+        if not vargs and XValueConverter.__number_type__(type_name) is not None:
+            values = list(values)
+            vargs = __column_separators__(values) or ()
+
+        converter = XValueConverter.__compile_hooked__(type_name, *vargs, failure_hook=failure_hook)
+        if not type_name.startswith("datetime"):
+            return [converter(value) for value in values]
+
+        parsed: dict[Any, Any] = {}
+        result = []
+        for value in values:
+            try:
+                result.append(parsed[value])
+            except KeyError:
+                result.append(parsed.setdefault(value, converter(value)))
+        return result
+
+    @staticmethod
+    def convert_column(values: Iterable[str | Any], type_name: str = "str", *vargs,
+                       failure_hook: failure_hook_type | None = None) -> Any:
+        """
+        Like convert_many but int and float columns are converted in bulk to a NumPy array when NumPy is installed.
+        Values failing an _or_none conversion become NaN in float columns and None in int columns (object array),
+        int columns beyond int64 are object arrays of Python ints.
+        Without NumPy, or for other types, the list of convert_many is returned
+        """
+        values = list(values)
+        base = XValueConverter.__number_type__(type_name)
+        numpy = __numpy__()
+        if numpy is None or base is None:
+            return XValueConverter.convert_many(values, type_name, *vargs, failure_hook=failure_hook)
+
+        if not vargs:
+            vargs = __column_separators__(values) or default_separators
+        decimal, thousands = __number_format__(*vargs)
+        integral = base == "int"
+        if not values:
+            return numpy.array([], dtype=numpy.int64 if integral else numpy.float64)
+        try:
+            if all(isinstance(v, str) for v in values):
+                texts = numpy.char.translate(numpy.asarray(values, dtype=str), number_blanks)
+                if thousands:
+                    texts = numpy.char.replace(texts, thousands, "")
+                if decimal != ".":
+                    texts = numpy.char.replace(texts, decimal, ".")
+            else:
+                texts = numpy.asarray([__normalize_number__(v, decimal, thousands) if isinstance(v, str) else str(v)
+                                       for v in values], dtype=str)
+
+            if not integral:
+                return texts.astype(numpy.float64)
+            # same syntax as __parse_int__: the whole part through int(), the fraction can only be zeros
+            parts = numpy.char.partition(texts, ".")
+            if numpy.any(numpy.char.strip(parts[:, 2], "0") != ""):
+                raise ValueError(f"Not an integer column: {type_name}")
+            return parts[:, 0].astype(numpy.int64)
+        except OverflowError:
+            # converted one by one below, Python ints are not bounded
+            pass
+        except ValueError:
+            if type_name == base:
+                raise
+
+        converted = XValueConverter.convert_many(values, type_name, *vargs, failure_hook=failure_hook)
+        if not integral:
+            return numpy.array([numpy.nan if v is None else v for v in converted], dtype=numpy.float64)
+        if None not in converted:
+            try:
+                return numpy.array(converted, dtype=numpy.int64)
+            except OverflowError:
+                pass
+        return numpy.array(converted, dtype=object)
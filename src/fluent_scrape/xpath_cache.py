@@ -0,0 +1,105 @@
+import decimal
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from lxml import etree
+
+
+class XPathCache(object):
+    """
+    Bounded LRU cache of compiled XPath expressions keyed by expression and namespace map.
+    lxml serializes calls on the same compiled XPath object, so every thread keeps its own
+    compiled copies while hit/miss counters are shared by the whole process.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size: int = max_size
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, xpath: str, namespaces: dict[str, str] | None = None) -> etree.XPath:
+        """
+        Get the compiled XPath, variables referenced as $name are passed as keyword arguments when called
+        """
+        entries: OrderedDict | None = getattr(self.local, "entries", None)
+        if entries is None:
+            entries = self.local.entries = OrderedDict()
+
+        key = (xpath, tuple(sorted(namespaces.items())) if namespaces else None)
+        compiled = entries.get(key)
+        if compiled is not None:
+            entries.move_to_end(key)
+            with self.lock:
+                self.hits += 1
+            return compiled
+
+        compiled = etree.XPath(xpath, namespaces=namespaces)
+        entries[key] = compiled
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+        with self.lock:
+            self.misses += 1
+        return compiled
+
+    def evaluate(self, node: Any, xpath: str, namespaces: dict[str, str] | None = None, **variables) -> Any:
+        return self.get(xpath, namespaces)(node, **variables)
+
+    def clear(self):
+        self.local = threading.local()
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0
+        }
+
+
+# string literals are skipped so that a $ inside quotes is not taken for a variable
+xpath_variable = re.compile(r"'[^']*'|\"[^\"]*\"|\$([A-Za-z_][\w.-]*)")
+
+
+def __xpath_literal__(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true()" if value else "false()"
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise Exception(f"XPath variables can not be {value}")
+        return format(decimal.Decimal(repr(value)), "f")
+    if not isinstance(value, str):
+        raise Exception(f"XPath variables bound in the browser must be strings, numbers or booleans, not {type(value)}")
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in value.split("'")) + ")"
+
+
+def __bind_variables__(xpath: str, **variables) -> str:
+    """
+    Substitute the $name references of xpath with literals, for engines that can not bind variables such as browsers
+    """
+    if not variables:
+        return xpath
+
+    def substitute(match: re.Match) -> str:
+        name = match.group(1)
+        if name is None:
+            return match.group(0)
+        if name not in variables:
+            raise Exception(f"Unbound XPath variable ${name} in: {xpath}")
+        return __xpath_literal__(variables[name])
+
+    return xpath_variable.sub(substitute, xpath)
+
+
+xpath_cache = XPathCache()
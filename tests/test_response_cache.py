@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from fluent_scrape import XResponseCache, XSqliteCacheStore
+
+
+class FakeResponse(object):
+    def __init__(self, url, status_code=200, headers=None, content=b""):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+
+def test_vary_splits_entries():
+    cache = XResponseCache()
+    calls = []
+
+    def fetch(url, headers):
+        calls.append(headers)
+        return FakeResponse(url, headers={"Vary": "Accept-Language"}, content=b"body")
+
+    cache.fetch("http://a/", {}, fetch, {"Accept-Language": "en"})
+    cache.fetch("http://a/", {}, fetch, {"Accept-Language": "fr"})
+    assert len(calls) == 2
+
+    # the fr response replaced the en one under the same key, only fr is answered from the cache
+    cache.fetch("http://a/", {}, fetch, {"Accept-Language": "fr"})
+    assert len(calls) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "revalidated": 0, "shared": 0}
+
+
+def test_vary_star_is_not_stored():
+    cache = XResponseCache()
+    calls = []
+
+    def fetch(url, headers):
+        calls.append(url)
+        return FakeResponse(url, headers={"Vary": "*"})
+
+    cache.fetch("http://a/", {}, fetch)
+    cache.fetch("http://a/", {}, fetch)
+    assert len(calls) == 2
+
+
+def test_revalidation_with_etag():
+    cache = XResponseCache(ttl=0)
+    sent = []
+
+    def fetch(url, headers):
+        sent.append(headers)
+        if "If-None-Match" in headers:
+            return FakeResponse(url, 304, {"ETag": '"v1"', "X-Checked": "1"})
+        return FakeResponse(url, headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+                            content=b"body")
+
+    first = cache.fetch("http://a/", {"Accept": "text/html"}, fetch)
+    second = cache.fetch("http://a/", {"Accept": "text/html"}, fetch)
+
+    assert sent[1] == {"Accept": "text/html", "If-None-Match": '"v1"',
+                       "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert second.status_code == 200 and second.content == first.content
+    assert second.headers["X-Checked"] == "1"
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_single_flight():
+    cache = XResponseCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch(url, headers):
+        calls.append(url)
+        started.set()
+        release.wait(5)
+        return FakeResponse(url, content=b"body")
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.fetch("http://a/", {}, fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.fetch("http://a/", {}, fetch)))
+                 for _ in range(4)]
+    for t in followers:
+        t.start()
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r.content == b"body" for r in results)
+    stats = cache.stats()
+    # followers arriving after the leader finished are answered by the store instead of the shared fetch
+    assert stats["misses"] == 1 and stats["shared"] + stats["hits"] == 4
+
+
+def test_single_flight_propagates_errors():
+    cache = XResponseCache()
+
+    def fetch(url, headers):
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            cache.fetch("http://a/", {}, fetch)
+    assert cache.in_flight == {}
+
+
+def test_sqlite_store_keeps_vary(tmp_path):
+    store = XSqliteCacheStore(str(tmp_path / "cache.db"))
+    cache = XResponseCache(disk=store)
+
+    def fetch(url, headers):
+        return FakeResponse(url, headers={"Vary": "Accept-Language"}, content=b"body")
+
+    cache.fetch("http://a/", {}, fetch, {"Accept-Language": "en"})
+    entry = store.get(XResponseCache.key("http://a/", {}))
+    store.close()
+    assert entry.vary == {"accept-language": "en"}
+    assert entry.matches({"Accept-Language": "en"}) and not entry.matches({"Accept-Language": "fr"})
@@ -0,0 +1,43 @@
+import copy
+
+import pytest
+
+from fluent_scrape import XResultAccumulator
+
+
+def test_shared_nested_values_are_not_mutated():
+    shared = {"rows": [1], "meta": {"tags": {"a"}, "pages": [0]}}
+    accumulator = XResultAccumulator()
+    accumulator.add(shared).add(shared).add({"meta": {"pages": [1], "last": 1}})
+
+    assert accumulator.result == {"rows": [1, 1], "meta": {"tags": {"a"}, "pages": [0, 0, 1], "last": 1}}
+    assert shared == {"rows": [1], "meta": {"tags": {"a"}, "pages": [0]}}
+
+
+def test_merged_partitions_are_not_mutated():
+    first = {"g": {"rows": [1, 2]}}
+    second = {"g": {"rows": [3]}, "h": [4]}
+    accumulator = XResultAccumulator().merge(first).merge(second)
+    accumulator.add({"h": [5]})
+
+    assert accumulator.result == {"g": {"rows": [1, 2, 3]}, "h": [4, 5]}
+    assert first == {"g": {"rows": [1, 2]}}
+    assert second == {"g": {"rows": [3]}, "h": [4]}
+
+
+@pytest.mark.parametrize("values", [
+    [{"a": [1]}, {"a": [2]}, {"a": {"b": 1}}],
+    [{"a": {"b": [1], "c": {1}}}, {"a": {"b": [2], "c": {2}, "d": None}}],
+    [{"a": 1}, {"a": [1]}, {"a": [2]}],
+    [{"a": {"b": {"c": [1]}}}, {"a": {"b": {"c": [2], "d": "x"}}}, {"a": {"b": "y"}}],
+])
+def test_matches_always_merger(values):
+    always_merger = pytest.importorskip("deepmerge").always_merger
+    expected = {}
+    for value in copy.deepcopy(values):
+        always_merger.merge(expected, value)
+
+    accumulator = XResultAccumulator()
+    for value in values:
+        accumulator.add(value)
+    assert accumulator.result == expected
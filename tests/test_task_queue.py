@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from fluent_scrape import XSqliteTaskQueue, XRedisTaskQueue
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_queue(request, tmp_path):
+    if request.param == "sqlite":
+        yield lambda max_attempts=5: XSqliteTaskQueue(str(tmp_path / "tasks.db"), "test", max_attempts)
+        return
+
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    yield lambda max_attempts=5: XRedisTaskQueue(job="test", max_attempts=max_attempts,
+                                                 client=fakeredis.FakeRedis(server=server))
+
+
+def drain(queue) -> list[str]:
+    urls = []
+    while (task := queue.lease()) is not None:
+        urls.append(task.url)
+        queue.ack(task)
+    return urls
+
+
+def test_put_deduplicates_by_group_and_url(make_queue):
+    queue = make_queue()
+    assert queue.put("g", "a")
+    assert not queue.put("g", "a")
+    assert not queue.put("g", "a", priority=5)
+    assert queue.put("h", "a")
+    assert queue.unfinished() == 2
+
+
+def test_lease_order_is_priority_then_insertion(make_queue):
+    queue = make_queue()
+    for url, priority in (("a", 0), ("b", 1), ("c", 0), ("d", 100000), ("e", 99999), ("f", -1)):
+        queue.put("g", url, priority)
+    assert drain(queue) == ["d", "e", "b", "a", "c", "f"]
+    assert queue.unfinished() == 0
+
+
+def test_ack_with_an_expired_lease_is_ignored(make_queue):
+    queue = make_queue()
+    queue.put("g", "a")
+    first = queue.lease(visibility_timeout=0.05)
+    time.sleep(0.1)
+    second = queue.lease()
+    assert second.url == "a" and second.attempts == 2
+    assert not queue.ack(first)
+    assert queue.ack(second)
+    assert queue.unfinished() == 0
+
+
+def test_nack_delays_the_next_delivery(make_queue):
+    queue = make_queue()
+    queue.put("g", "a")
+    queue.nack(queue.lease(), delay=0.1)
+    assert queue.lease() is None
+    assert queue.unfinished() == 1
+    time.sleep(0.15)
+    assert queue.lease().attempts == 2
+
+
+def test_task_fails_after_max_attempts(make_queue):
+    queue = make_queue(max_attempts=2)
+    queue.put("g", "a")
+    queue.put("g", "b")
+    for _ in range(2):
+        task = queue.lease()
+        assert task.url == "a"
+        queue.nack(task)
+    assert queue.lease().url == "b"
+    assert [tuple(t) for t in queue.failed()] == [("g", "a")]
+
+
+def test_concurrent_puts_queue_each_url_once(make_queue):
+    queues = [make_queue() for _ in range(8)]
+    results: list[bool] = []
+    lock = threading.Lock()
+
+    def put_all(queue):
+        added = [queue.put("g", f"u{i}") for i in range(50)]
+        with lock:
+            results.extend(added)
+
+    threads = [threading.Thread(target=put_all, args=(queue,)) for queue in queues]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(results) == 50
+    assert sorted(drain(queues[0])) == sorted(f"u{i}" for i in range(50))
@@ -0,0 +1,139 @@
+import math
+
+import pytest
+
+from fluent_scrape import XValueConverter, value_converter
+
+
+@pytest.fixture
+def failures():
+    recorded = []
+    XValueConverter.failure_hook = lambda type_name, value, error: recorded.append((type_name, value, type(error)))
+    yield recorded
+    XValueConverter.failure_hook = None
+
+
+@pytest.fixture
+def without_numpy(monkeypatch):
+    monkeypatch.setattr(value_converter, "__numpy__", lambda: None)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.234,5", (",", ".")),
+    ("1,234.5", (".", ",")),
+    ("1.234.567", (",", ".")),
+    ("1,234,567", (".", ",")),
+    ("12,5", (",", ".")),
+    ("12.50", (".", ",")),
+    ("0,125", (",", ".")),
+    ("1234,567", (",", ".")),
+    ("1,234", None),
+    ("-1.000", None),
+    ("1234", None),
+])
+def test_guess_separators(text, expected):
+    assert value_converter.__guess_separators__(text) == expected
+
+
+@pytest.mark.parametrize("value, type_name, args, expected", [
+    ("1,234", "int", (), 1234),
+    ("1,234", "float", (), 1234.0),
+    ("1.000", "int", (), 1),
+    ("1.000", "float", (), 1.0),
+    ("1 234 567", "int", (), 1234567),
+    ("1'234", "int", (), 1234),
+    ("12.0", "int", (), 12),
+    ("1.234,5", "float", (), 1234.5),
+    ("1,234.5", "float", (), 1234.5),
+    ("-3,5", "float", (), -3.5),
+    ("1e3", "float", (), 1000.0),
+    ("1.234", "float", (",", "."), 1234.0),
+    ("1.000", "int", (",", "."), 1000),
+    ("1.234,5", "int_or_none", (",", "."), None),
+])
+def test_convert_numbers(value, type_name, args, expected):
+    assert XValueConverter.convert(value, type_name, *args) == expected
+
+
+@pytest.mark.parametrize("value", ["1,234", "1.000", "12,5", "1.234,5", "7"])
+def test_type_does_not_change_the_number(value):
+    assert XValueConverter.convert(value, "int_or_none") in (None, XValueConverter.convert(value, "float"))
+
+
+def test_separators_are_guessed_once_per_column():
+    assert XValueConverter.convert_many(["1,234", "1,234.5"], "float") == [1234.0, 1234.5]
+    assert XValueConverter.convert_many(["1,234", "1.234,5", "7"], "float") == [1.234, 1234.5, 7.0]
+    assert XValueConverter.convert_many(["1.000", "2.000,0"], "int") == [1000, 2000]
+    assert XValueConverter.convert_many(["1,234", "5"], "int") == [1234, 5]
+
+
+def test_int_with_fraction_raises():
+    with pytest.raises(ValueError):
+        XValueConverter.convert("12.50", "int")
+
+
+def test_or_none_reports_failures(failures):
+    assert XValueConverter.convert("12.50", "int_or_none") is None
+    assert XValueConverter.convert("n/a", "float_or_none") is None
+    assert XValueConverter.convert("7", "int_or_none") == 7
+    assert failures == [("int_or_none", "12.50", ValueError), ("float_or_none", "n/a", ValueError)]
+
+
+def test_convert_column_without_numpy(without_numpy, failures):
+    assert XValueConverter.convert_column(["1.000", "2,5"], "float") == [1000.0, 2.5]
+    assert XValueConverter.convert_column(["1,5", "x"], "float_or_none") == [1.5, None]
+    assert failures == [("float_or_none", "x", ValueError)]
+    with pytest.raises(ValueError):
+        XValueConverter.convert_column(["12.50"], "int")
+
+
+def test_convert_column_with_numpy(failures):
+    numpy = pytest.importorskip("numpy")
+
+    ints = XValueConverter.convert_column(["1,000", "12", "3.0"], "int")
+    assert ints.dtype == numpy.int64 and ints.tolist() == [1000, 12, 3]
+
+    floats = XValueConverter.convert_column(["1,5", "2", "1.234,5"], "float")
+    assert floats.dtype == numpy.float64 and floats.tolist() == [1.5, 2.0, 1234.5]
+
+    assert XValueConverter.convert_column([], "int").tolist() == []
+
+    floats = XValueConverter.convert_column(["1.234,5", "2"], "float", ",", ".")
+    assert floats.tolist() == [1234.5, 2.0]
+
+    with pytest.raises(ValueError):
+        XValueConverter.convert_column(["12.50"], "int")
+
+    floats = XValueConverter.convert_column(["1.5", "x"], "float_or_none")
+    assert floats[0] == 1.5 and math.isnan(floats[1])
+    ints = XValueConverter.convert_column(["1", "x"], "int_or_none")
+    assert ints.dtype == object and ints.tolist() == [1, None]
+    assert failures == [("float_or_none", "x", ValueError), ("int_or_none", "x", ValueError)]
+
+
+def test_convert_column_matches_convert_many():
+    pytest.importorskip("numpy")
+    for values, type_name in ((["1.000", "1,234", "12", "1 234 567", "7.0"], "int"),
+                              (["1,234", "1.234,5", "0.5", "3"], "float"),
+                              (["1,234", "1,234.5"], "float"),
+                              (["99999999999999999999", "1"], "int"),
+                              (["99999999999999999999", "x"], "int_or_none")):
+        assert XValueConverter.convert_column(values, type_name).tolist() == \
+            XValueConverter.convert_many(values, type_name)
+
+    for values, type_name in ((["1e3"], "int"), (["12.50", "1"], "int")):
+        with pytest.raises(ValueError):
+            XValueConverter.convert_many(values, type_name)
+        with pytest.raises(ValueError):
+            XValueConverter.convert_column(values, type_name)
+    assert XValueConverter.convert_column(["1e3", "2"], "int_or_none").tolist() == [None, 2]
+
+
+def test_failure_hook_per_call(failures):
+    own = []
+    hook = lambda type_name, value, error: own.append((type_name, value))
+    assert XValueConverter.convert("x", "int_or_none", failure_hook=hook) is None
+    assert XValueConverter.convert_many(["1", "y"], "float_or_none", failure_hook=hook) == [1.0, None]
+    assert XValueConverter.convert("3", "int", failure_hook=hook) == 3
+    assert own == [("int_or_none", "x"), ("float_or_none", "y")]
+    assert failures == []
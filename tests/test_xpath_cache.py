@@ -0,0 +1,26 @@
+import pytest
+from lxml import html
+
+from fluent_scrape import xpath_cache
+
+from fluent_scrape.xpath_cache import __bind_variables__
+
+page = html.fromstring("<table><tr><td>a</td><td>it's \"x\"</td></tr><tr><td>$i</td><td>2.5</td></tr></table>")
+
+
+@pytest.mark.parametrize("xpath, variables", [
+    ("//tr[$i]/td[1]/text()", {"i": 2}),
+    ("//td[. = $v]/text()", {"v": "it's \"x\""}),
+    ("//td[. = $v]/text()", {"v": "$i"}),
+    ("//td[. = '$i']/text()", {"i": 1}),
+    ("//td[number(.) = $n]/text()", {"n": 2.5}),
+    ("//td[$flag]/text()", {"flag": False}),
+])
+def test_bound_xpath_matches_lxml_variables(xpath, variables):
+    assert page.xpath(__bind_variables__(xpath, **variables)) == xpath_cache.evaluate(page, xpath, **variables)
+
+
+def test_bind_variables_rejects_unbound_names():
+    assert __bind_variables__("//td[$i]") == "//td[$i]"
+    with pytest.raises(Exception, match=r"\$j"):
+        __bind_variables__("//tr[$i]/td[$j]", i=1)